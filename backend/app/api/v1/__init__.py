@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, cafes, stock, menu, staff, orders, expenses, reports, admin, categories, upload, waste
+from app.api.v1.endpoints import auth, cafes, stock, menu, staff, orders, expenses, reports, admin, categories, upload, waste, exports
 
 api_router = APIRouter()
 
@@ -24,3 +24,4 @@ api_router.include_router(orders.router, prefix="/cafes/{cafe_id}/orders", tags=
 api_router.include_router(expenses.router, prefix="/cafes/{cafe_id}/expenses", tags=["expenses"])
 api_router.include_router(reports.router, prefix="/cafes/{cafe_id}/reports", tags=["reports"])
 api_router.include_router(waste.router, prefix="/cafes/{cafe_id}/waste", tags=["waste"])
+api_router.include_router(exports.router, prefix="/cafes/{cafe_id}/exports", tags=["exports"])
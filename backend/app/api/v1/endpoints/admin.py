@@ -2,8 +2,9 @@ from typing import List
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.deps import get_current_user
+from app.core.database import get_db, pool_metrics
+from app.core.static_files import static_file_metrics
+from app.core.deps import get_current_user, invalidate_cafe_access
 from app.models.user import User
 from app.models.cafe import Cafe, UserCafeRole
 from app.schemas.user import UserResponse
@@ -47,7 +48,7 @@ async def create_user(
     db: Session = Depends(get_db)
 ):
     """Create a new user (admin only)"""
-    from app.core.security import get_password_hash
+    from app.core.security import get_password_hash_async
     
     # Check if user already exists
     existing_user = db.query(User).filter(User.email == user_data.email).first()
@@ -61,7 +62,7 @@ async def create_user(
     new_user = User(
         email=user_data.email,
         full_name=user_data.full_name,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await get_password_hash_async(user_data.password),
         is_admin=False
     )
     db.add(new_user)
@@ -103,6 +104,7 @@ async def create_cafe(
     )
     db.add(admin_role)
     db.commit()
+    invalidate_cafe_access(cafe_id=new_cafe.id)
     db.refresh(new_cafe)
     
     return new_cafe
@@ -153,6 +155,7 @@ async def assign_cafe_to_user(
         cafe.owner_id = assignment.user_id
     
     db.commit()
+    invalidate_cafe_access(assignment.user_id, assignment.cafe_id)
     
     return {"message": f"User assigned to cafe as {assignment.role}"}
 
@@ -176,6 +179,7 @@ async def remove_cafe_assignment(
     
     db.delete(role)
     db.commit()
+    invalidate_cafe_access(assignment.user_id, assignment.cafe_id)
     
     return {"message": "User removed from cafe"}
 
@@ -200,3 +204,17 @@ async def get_cafe_users(
             })
     
     return result
+
+@router.get("/db-pool", response_model=dict)
+async def get_db_pool_metrics(
+    admin: User = Depends(require_admin)
+):
+    """Connection pool usage and checkout wait times for this process (admin only)"""
+    return pool_metrics()
+
+@router.get("/static-files", response_model=dict)
+async def get_static_file_metrics(
+    admin: User = Depends(require_admin)
+):
+    """Requests, 304s and bytes served from /uploads by this process (admin only)"""
+    return static_file_metrics()
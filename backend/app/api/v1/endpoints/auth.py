@@ -2,7 +2,9 @@ from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import (
+    get_password_hash_async, verify_and_update_password_async, create_access_token
+)
 from app.core.deps import get_current_user
 from app.core.config import settings
 from app.models.user import User
@@ -30,7 +32,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     new_user = User(
         email=user_data.email,
         full_name=user_data.full_name,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await get_password_hash_async(user_data.password),
         is_admin=is_first_user
     )
     db.add(new_user)
@@ -42,23 +44,26 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     """Login and get access token"""
-    print(f"Login attempt for: {credentials.email}")
     user = db.query(User).filter(User.email == credentials.email).first()
     
+    is_valid, new_hash = False, None
     if user:
-        print(f"User found: {user.id}")
-        is_valid = verify_password(credentials.password, user.password_hash)
-        print(f"Password check result: {is_valid}")
-    else:
-        print("User not found")
-
-    if not user or not verify_password(credentials.password, user.password_hash):
+        is_valid, new_hash = await verify_and_update_password_async(
+            credentials.password, user.password_hash
+        )
+    
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Stored hash uses an old cost factor or scheme: replace it transparently
+    if new_hash:
+        user.password_hash = new_hash
+        db.commit()
+    
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": str(user.id)},
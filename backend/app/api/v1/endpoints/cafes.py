@@ -3,7 +3,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.deps import get_current_user, verify_cafe_access
+from app.core.deps import get_current_user, invalidate_cafe_access, verify_cafe_access
 from app.models.user import User
 from app.models.cafe import Cafe, UserCafeRole
 from app.schemas.cafe import CafeCreate, CafeUpdate, CafeResponse
@@ -49,6 +49,7 @@ async def create_cafe(
     )
     db.add(owner_role)
     db.commit()
+    invalidate_cafe_access(cafe_id=new_cafe.id)
     db.refresh(new_cafe)
     
     return new_cafe
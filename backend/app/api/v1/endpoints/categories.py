@@ -1,26 +1,32 @@
 from typing import List
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.deps import get_current_user, verify_cafe_access
+from app.core.http_cache import check_etag
 from app.models.user import User
 from app.models.category import MenuCategory
 from app.schemas.category import (
     MenuCategoryCreate, MenuCategoryUpdate, MenuCategoryResponse
 )
+from app.services.resource_versions import Resource, bump_resource_versions, resource_etag
 
 router = APIRouter()
 
 @router.get("", response_model=List[MenuCategoryResponse])
 async def get_categories(
     cafe_id: UUID,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all menu categories for a cafe"""
+    """Get all menu categories for a cafe (ETag, 304 if unchanged)"""
     await verify_cafe_access(cafe_id, current_user, db)
     
+    check_etag(request, response, resource_etag(db, cafe_id, Resource.categories))
+    
     categories = db.query(MenuCategory).filter(
         MenuCategory.cafe_id == cafe_id
     ).order_by(MenuCategory.display_order, MenuCategory.name).all()
@@ -62,6 +68,7 @@ async def create_category(
     )
     
     db.add(new_category)
+    bump_resource_versions(db, cafe_id, Resource.categories)
     db.commit()
     db.refresh(new_category)
     
@@ -90,6 +97,7 @@ async def update_category(
     for field, value in update_data.items():
         setattr(category, field, value)
     
+    bump_resource_versions(db, cafe_id, Resource.categories)
     db.commit()
     db.refresh(category)
     
@@ -120,4 +128,5 @@ async def delete_category(
             item.category_id = None
     
     db.delete(category)
+    bump_resource_versions(db, cafe_id, Resource.categories, Resource.menu)
     db.commit()
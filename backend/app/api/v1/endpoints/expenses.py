@@ -11,6 +11,7 @@ from app.schemas.expense import (
     MonthlyExpenseCreate, MonthlyExpenseUpdate, MonthlyExpenseResponse,
     DailyExpenseCreate, DailyExpenseUpdate, DailyExpenseResponse
 )
+from app.services.daily_summary import record_daily_summary
 
 router = APIRouter()
 
@@ -144,6 +145,7 @@ async def create_daily_expense(
         amount=expense_data.amount
     )
     db.add(new_expense)
+    record_daily_summary(db, cafe_id, expense_data.date, daily_expenses=expense_data.amount)
     db.commit()
     db.refresh(new_expense)
     
@@ -168,6 +170,9 @@ async def update_daily_expense(
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     
+    # Move the old amount out of the summary, the new one in below
+    record_daily_summary(db, cafe_id, expense.date, daily_expenses=-expense.amount)
+    
     if expense_data.description is not None:
         expense.description = expense_data.description
     if expense_data.amount is not None:
@@ -175,6 +180,8 @@ async def update_daily_expense(
     if expense_data.date is not None:
         expense.date = expense_data.date
     
+    record_daily_summary(db, cafe_id, expense.date, daily_expenses=expense.amount)
+    
     db.commit()
     db.refresh(expense)
     
@@ -198,5 +205,6 @@ async def delete_daily_expense(
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     
+    record_daily_summary(db, cafe_id, expense.date, daily_expenses=-expense.amount)
     db.delete(expense)
     db.commit()
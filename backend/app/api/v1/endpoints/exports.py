@@ -0,0 +1,45 @@
+from uuid import UUID
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.core.deps import get_current_user, verify_cafe_access
+from app.models.user import User
+from app.services.exports import (
+    EXPORT_ENCODERS, ExportDatasetName, ExportFormat, parquet_available, stream_export
+)
+
+router = APIRouter()
+
+@router.get("/{dataset}")
+async def export_dataset(
+    cafe_id: UUID,
+    dataset: ExportDatasetName,
+    start_date: date,
+    end_date: date,
+    format: ExportFormat = ExportFormat.csv,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stream orders, order items, stock transactions or expenses for a date range as CSV, NDJSON or Parquet"""
+    await verify_cafe_access(cafe_id, current_user, db, required_role="manager")
+    
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must not be after end_date"
+        )
+    
+    if format == ExportFormat.parquet and not parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parquet export requires pyarrow to be installed"
+        )
+    
+    filename = f"{dataset.value}_{start_date}_{end_date}.{format.value}"
+    return StreamingResponse(
+        stream_export(dataset, format, cafe_id, start_date, end_date),
+        media_type=EXPORT_ENCODERS[format].media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,52 +1,120 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
-from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from datetime import date, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.core.deps import get_current_user, verify_cafe_access
+from app.core.http_cache import check_etag
 from app.models.user import User
-from app.models.menu import MenuItem, MenuPriceHistory, MenuItemRecipe
+from app.models.menu import MenuItem, MenuPriceHistory, MenuItemRecipe, MenuItemCost
 from app.models.stock import StockItem
 from app.schemas.menu import (
     MenuItemCreate, MenuItemUpdate, MenuItemResponse,
     MenuPriceHistoryCreate, MenuPriceHistoryResponse,
-    MenuItemRecipeCreate, MenuItemRecipeResponse, MenuItemRecipeDetail
+    MenuItemRecipeCreate, MenuItemRecipeResponse, MenuItemRecipeDetail,
+    MenuEngineeringResponse
 )
+from app.services.daily_summary import business_day
+from app.services.history import as_of_query, latest_as_of
+from app.services.menu_costs import (
+    current_cost_join, menu_engineering, refresh_menu_item_costs, resolve_menu_item_costs
+)
+from app.services.pricing import recipe_cost_cache
+from app.services.resource_versions import Resource, bump_resource_versions, resource_etag
 
 router = APIRouter()
 
 @router.get("", response_model=List[MenuItemResponse])
 async def get_menu_items(
     cafe_id: UUID,
+    request: Request,
+    response: Response,
+    include_costs: bool = False,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all menu items for a cafe"""
+    """Get all menu items for a cafe, optionally with current recipe cost and margin (ETag, 304 if unchanged)"""
     await verify_cafe_access(cafe_id, current_user, db)
     
-    items = db.query(MenuItem).filter(MenuItem.cafe_id == cafe_id).order_by(MenuItem.name).all()
+    # Prices and costs are as of today, so the tag changes daily too
+    etag = await db.run_sync(resource_etag, cafe_id, Resource.menu, include_costs, date.today())
+    check_etag(request, response, etag)
+    
+    return await db.run_sync(_list_menu_items, cafe_id, include_costs)
+
+def _list_menu_items(db: Session, cafe_id: UUID, include_costs: bool) -> List[dict]:
+    """Menu items of a cafe with their current price, and cost and margin if asked"""
+    today = date.today()
+    
+    # Current price of every item of the cafe, resolved in the same query
+    current_price = as_of_query(
+        db, MenuPriceHistory.menu_item_id, MenuPriceHistory.sale_price, on_date=today
+    ).join(MenuItem).filter(MenuItem.cafe_id == cafe_id).subquery()
+    
+    query = db.query(MenuItem, current_price.c.sale_price).outerjoin(
+        current_price, current_price.c.menu_item_id == MenuItem.id
+    )
+    
+    # Costs and margins come from the maintained menu_item_cost table
+    costs = {}
+    if include_costs:
+        query = query.add_entity(MenuItemCost).outerjoin(MenuItemCost, current_cost_join(today))
+    rows = query.filter(MenuItem.cafe_id == cafe_id).order_by(MenuItem.name).all()
+    if include_costs:
+        costs = resolve_menu_item_costs(db, {row[0].id: row[2] for row in rows})
+        db.commit()
     
-    # Add current sale price to each item
     result = []
-    for item in items:
-        latest_price = db.query(MenuPriceHistory).filter(
-            MenuPriceHistory.menu_item_id == item.id
-        ).order_by(MenuPriceHistory.start_date.desc()).first()
-        
+    for item, sale_price, *_ in rows:
         item_dict = {
             'id': item.id,
             'cafe_id': item.cafe_id,
             'name': item.name,
             'category_id': item.category_id,
             'image_url': item.image_url,
-            'sale_price': latest_price.sale_price if latest_price else 0,
+            'image_variants': item.image_variants,
+            'sale_price': sale_price if sale_price is not None else 0,
             'created_at': item.created_at
         }
+        if include_costs:
+            cost = costs[item.id]
+            item_dict['current_cost'] = cost['unit_cost']
+            item_dict['margin'] = item_dict['sale_price'] - cost['unit_cost']
+            item_dict['margin_percent'] = cost['margin_percent']
+            item_dict['cost_effective_date'] = cost['cost_effective_date']
         result.append(item_dict)
     
     return result
 
+@router.get("/engineering", response_model=MenuEngineeringResponse)
+async def get_menu_engineering(
+    cafe_id: UUID,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get current margins and sales of the whole menu, classified star/plowhorse/puzzle/dog (default last 30 days)"""
+    await verify_cafe_access(cafe_id, current_user, db)
+    
+    end_date = end_date or business_day()
+    start_date = start_date or end_date - timedelta(days=29)
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must not be after end_date"
+        )
+    
+    return await db.run_sync(_menu_engineering, cafe_id, start_date, end_date)
+
+def _menu_engineering(db: Session, cafe_id: UUID, start_date: date, end_date: date) -> dict:
+    """Menu engineering matrix, keeping any cost rows it had to refresh"""
+    report = menu_engineering(db, cafe_id, start_date, end_date)
+    db.commit()
+    return report
+
 @router.post("", response_model=MenuItemResponse, status_code=status.HTTP_201_CREATED)
 async def create_menu_item(
     cafe_id: UUID,
@@ -73,7 +141,8 @@ async def create_menu_item(
         cafe_id=cafe_id,
         name=item_data.name,
         category_id=item_data.category_id,
-        image_url=item_data.image_url
+        image_url=item_data.image_url,
+        image_variants=item_data.model_dump(exclude_none=True).get('image_variants')
     )
     db.add(new_item)
     db.flush()
@@ -85,6 +154,9 @@ async def create_menu_item(
         start_date=date.today()
     )
     db.add(price_history)
+    db.flush()
+    refresh_menu_item_costs(db, [new_item.id])
+    bump_resource_versions(db, cafe_id, Resource.menu)
     db.commit()
     db.refresh(new_item)
     
@@ -95,6 +167,7 @@ async def create_menu_item(
         'name': new_item.name,
         'category_id': new_item.category_id,
         'image_url': new_item.image_url,
+        'image_variants': new_item.image_variants,
         'sale_price': item_data.sale_price,
         'created_at': new_item.created_at
     }
@@ -127,12 +200,15 @@ async def update_menu_item(
     
     if item_data.image_url is not None:
         item.image_url = item_data.image_url
+        # Variants of the previous image no longer apply
+        item.image_variants = item_data.model_dump(exclude_none=True).get('image_variants')
     
     # Get current price for response
-    latest_price = db.query(MenuPriceHistory).filter(
-        MenuPriceHistory.menu_item_id == item.id
-    ).order_by(MenuPriceHistory.start_date.desc()).first()
+    latest_price = latest_as_of(
+        db, MenuPriceHistory.menu_item_id, MenuPriceHistory.sale_price, [item.id]
+    ).get(item.id)
     
+    bump_resource_versions(db, cafe_id, Resource.menu)
     db.commit()
     db.refresh(item)
     
@@ -143,7 +219,8 @@ async def update_menu_item(
         'name': item.name,
         'category_id': item.category_id,
         'image_url': item.image_url,
-        'sale_price': latest_price.sale_price if latest_price else 0,
+        'image_variants': item.image_variants,
+        'sale_price': latest_price if latest_price is not None else 0,
         'created_at': item.created_at
     }
     return result
@@ -173,6 +250,9 @@ async def update_menu_item_price(
         start_date=price_data.start_date or date.today()
     )
     db.add(new_price)
+    db.flush()
+    refresh_menu_item_costs(db, [item_id])
+    bump_resource_versions(db, cafe_id, Resource.menu)
     db.commit()
     db.refresh(new_price)
     
@@ -246,8 +326,12 @@ async def add_recipe_ingredient(
         quantity_used=recipe_data.quantity_used
     )
     db.add(new_recipe)
+    db.flush()
+    refresh_menu_item_costs(db, [item_id])
+    bump_resource_versions(db, cafe_id, Resource.menu, Resource.costs)
     db.commit()
     db.refresh(new_recipe)
+    recipe_cost_cache.invalidate_menu_items([item_id])
     
     return new_recipe
 
@@ -281,7 +365,11 @@ async def delete_recipe_ingredient(
         raise HTTPException(status_code=404, detail="Recipe ingredient not found")
     
     db.delete(recipe_ingredient)
+    db.flush()
+    refresh_menu_item_costs(db, [item_id])
+    bump_resource_versions(db, cafe_id, Resource.menu, Resource.costs)
     db.commit()
+    recipe_cost_cache.invalidate_menu_items([item_id])
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_menu_item(
@@ -302,4 +390,6 @@ async def delete_menu_item(
         raise HTTPException(status_code=404, detail="Menu item not found")
     
     db.delete(item)
+    bump_resource_versions(db, cafe_id, Resource.menu)
     db.commit()
+    recipe_cost_cache.invalidate_menu_items([item_id])
@@ -1,49 +1,48 @@
-from typing import List
-from uuid import UUID
-from datetime import datetime, date
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from uuid import UUID, uuid4
+from datetime import datetime, date, timedelta
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_async_db
 from app.core.deps import get_current_user, verify_cafe_access
+from app.core.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
 from app.models.user import User
 from app.models.order import Order, OrderItem
+from app.models.menu import MenuItem
 from app.models.staff import Staff
-from app.models.menu import MenuItem, MenuItemRecipe, MenuPriceHistory
-from app.models.stock import StockItem, StockCostHistory
-from app.schemas.order import OrderCreate, OrderResponse, OrderItemResponse
+from app.models.stock import StockTransactionType
+from app.schemas.order import (
+    OrderCreate, OrderResponse, OrderItemResponse, OrderPage,
+    BulkOrderCreate, BulkOrderResult, BulkOrderRowError, MAX_BULK_ORDERS
+)
+from app.services.daily_summary import business_day, business_timestamp, record_daily_summary
+from app.services.order_import import BulkOrder, import_orders, parse_orders_csv
+from app.services.pricing import PriceNotFoundError, price_order
+from app.services.resource_versions import Resource, bump_resource_versions
+from app.services.stock_ledger import (
+    apply_stock_deltas, ledger_rows, order_usage, record_stock_transactions
+)
 
 router = APIRouter()
 
-def calculate_menu_item_cost(db: Session, menu_item_id: UUID, effective_date: date) -> float:
-    """Calculate cost of goods for a menu item on a specific date"""
-    recipe_items = db.query(MenuItemRecipe).filter(
-        MenuItemRecipe.menu_item_id == menu_item_id
-    ).all()
-    
-    total_cost = 0.0
-    for ingredient in recipe_items:
-        # Get cost for this stock item on the effective date
-        cost_entry = db.query(StockCostHistory).filter(
-            StockCostHistory.stock_item_id == ingredient.stock_item_id,
-            StockCostHistory.start_date <= effective_date
-        ).order_by(StockCostHistory.start_date.desc()).first()
-        
-        if cost_entry:
-            total_cost += float(ingredient.quantity_used * cost_entry.cost_per_unit)
-    
-    return total_cost
-
 @router.get("", response_model=List[OrderResponse])
 async def get_orders(
     cafe_id: UUID,
     date: date = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get orders for a cafe, optionally filtered by date"""
     await verify_cafe_access(cafe_id, current_user, db)
     
-    query = db.query(Order).filter(Order.cafe_id == cafe_id)
+    return await db.run_sync(_list_orders, cafe_id, date)
+
+def _list_orders(db: Session, cafe_id: UUID, date: Optional[date]) -> List[OrderResponse]:
+    """Orders of a cafe newest first, optionally for one day"""
+    query = _order_rows_query(db).filter(Order.cafe_id == cafe_id)
     
     if date:
         start_of_day = datetime.combine(date, datetime.min.time())
@@ -53,50 +52,119 @@ async def get_orders(
             Order.timestamp <= end_of_day
         )
     
-    orders = query.order_by(Order.timestamp.desc()).all()
+    return _load_order_responses(db, query.order_by(Order.timestamp.desc(), Order.id.desc()).all())
+
+@router.get("/history", response_model=OrderPage)
+async def get_order_history(
+    cafe_id: UUID,
+    cursor: Optional[str] = None,
+    page_size: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    staff_id: Optional[UUID] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get order history newest first, one page at a time (pass next_cursor to continue)"""
+    await verify_cafe_access(cafe_id, current_user, db)
+    
+    return await db.run_sync(
+        _order_history_page, cafe_id, cursor, page_size, start_date, end_date, staff_id
+    )
+
+def _order_history_page(
+    db: Session,
+    cafe_id: UUID,
+    cursor: Optional[str],
+    page_size: int,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    staff_id: Optional[UUID]
+) -> OrderPage:
+    """One page of a cafe's order history"""
+    query = _order_rows_query(db).filter(Order.cafe_id == cafe_id)
     
-    # Format response
-    response = []
-    for order in orders:
-        items = []
-        total_revenue = 0
-        total_cost = 0
-        
-        for item in order.items:
-            items.append(OrderItemResponse(
+    if start_date:
+        query = query.filter(Order.timestamp >= datetime.combine(start_date, datetime.min.time()))
+    if end_date:
+        query = query.filter(Order.timestamp < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+    if staff_id:
+        query = query.filter(Order.staff_id == staff_id)
+    if cursor:
+        after_timestamp, after_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Order.timestamp, Order.id) < tuple_(after_timestamp, after_id))
+    
+    # Fetch one extra row to know whether another page follows
+    orders = _load_order_responses(
+        db, query.order_by(Order.timestamp.desc(), Order.id.desc()).limit(page_size + 1).all()
+    )
+    
+    next_cursor = None
+    if len(orders) > page_size:
+        orders = orders[:page_size]
+        next_cursor = encode_cursor(orders[-1].timestamp, orders[-1].id)
+    
+    return OrderPage(items=orders, next_cursor=next_cursor)
+
+def _order_rows_query(db: Session):
+    """Orders with staff names and per-order totals computed in SQL"""
+    total_revenue = select(
+        func.coalesce(func.sum(OrderItem.price_at_sale * OrderItem.quantity), 0)
+    ).where(OrderItem.order_id == Order.id).correlate(Order).scalar_subquery()
+    total_cost = select(
+        func.coalesce(func.sum(OrderItem.cost_at_sale * OrderItem.quantity), 0)
+    ).where(OrderItem.order_id == Order.id).correlate(Order).scalar_subquery()
+    
+    return db.query(
+        Order.id, Order.cafe_id, Order.staff_id, Staff.name, Order.timestamp,
+        total_revenue, total_cost
+    ).join(Staff, Staff.id == Order.staff_id)
+
+def _load_order_responses(db: Session, order_rows) -> List[OrderResponse]:
+    """Attach items and menu names to rows of _order_rows_query with one more query"""
+    items_by_order = {}
+    if order_rows:
+        item_rows = db.query(OrderItem, MenuItem.name).join(MenuItem).filter(
+            OrderItem.order_id.in_([row[0] for row in order_rows])
+        ).order_by(OrderItem.created_at)
+        for item, menu_item_name in item_rows:
+            items_by_order.setdefault(item.order_id, []).append(OrderItemResponse(
                 id=item.id,
                 menu_item_id=item.menu_item_id,
-                menu_item_name=item.menu_item.name,
+                menu_item_name=menu_item_name,
                 quantity=item.quantity,
                 price_at_sale=item.price_at_sale,
                 cost_at_sale=item.cost_at_sale
             ))
-            total_revenue += item.price_at_sale * item.quantity
-            total_cost += item.cost_at_sale * item.quantity
-        
-        response.append(OrderResponse(
-            id=order.id,
-            cafe_id=order.cafe_id,
-            staff_id=order.staff_id,
-            staff_name=order.staff.name,
-            timestamp=order.timestamp,
-            items=items,
-            total_revenue=total_revenue,
-            total_cost=total_cost
-        ))
     
-    return response
+    return [
+        OrderResponse(
+            id=order_id,
+            cafe_id=order_cafe_id,
+            staff_id=staff_id,
+            staff_name=staff_name,
+            timestamp=timestamp,
+            items=items_by_order.get(order_id, []),
+            total_revenue=revenue,
+            total_cost=cost
+        )
+        for order_id, order_cafe_id, staff_id, staff_name, timestamp, revenue, cost in order_rows
+    ]
 
 @router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 async def create_order(
     cafe_id: UUID,
     order_data: OrderCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new order (daily sales report)"""
     await verify_cafe_access(cafe_id, current_user, db)
     
+    return await db.run_sync(_create_order, cafe_id, order_data, current_user.id)
+
+def _create_order(db: Session, cafe_id: UUID, order_data: OrderCreate, user_id: UUID) -> OrderResponse:
+    """Price, store and apply a new order, then commit"""
     # Verify staff belongs to this cafe
     staff = db.query(Staff).filter(
         Staff.id == order_data.staff_id,
@@ -107,82 +175,73 @@ async def create_order(
         raise HTTPException(status_code=404, detail="Staff not found in this cafe")
     
     # Create order
-    order_timestamp = order_data.timestamp or datetime.now()
-    sale_date = order_timestamp.date()
+    order_timestamp = business_timestamp(order_data.timestamp)
+    sale_date = business_day(order_timestamp)
+    
+    # Resolve prices, costs and recipes for every line at once
+    try:
+        priced = price_order(
+            db,
+            ((item.menu_item_id, item.quantity) for item in order_data.items),
+            sale_date
+        )
+    except PriceNotFoundError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     new_order = Order(
+        id=uuid4(),
         cafe_id=cafe_id,
         staff_id=order_data.staff_id,
         timestamp=order_timestamp
     )
     db.add(new_order)
-    db.flush()
-    
-    # Process each item
-    total_revenue = 0
-    total_cost = 0
-    items_response = []
-    
-    for item_input in order_data.items:
-        # Get current price for this item
-        price_entry = db.query(MenuPriceHistory).filter(
-            MenuPriceHistory.menu_item_id == item_input.menu_item_id,
-            MenuPriceHistory.start_date <= sale_date
-        ).order_by(MenuPriceHistory.start_date.desc()).first()
-        
-        if not price_entry:
-            raise HTTPException(
-                status_code=400,
-                detail=f"No price found for menu item {item_input.menu_item_id}"
-            )
-        
-        # Calculate cost
-        cost_per_item = calculate_menu_item_cost(db, item_input.menu_item_id, sale_date)
-        
-        # Create order item
-        order_item = OrderItem(
+    
+    # IDs are generated client-side so all order items go out in one batched INSERT
+    order_items = [
+        OrderItem(
+            id=uuid4(),
             order_id=new_order.id,
-            menu_item_id=item_input.menu_item_id,
-            quantity=item_input.quantity,
-            price_at_sale=price_entry.sale_price,
-            cost_at_sale=cost_per_item
+            menu_item_id=line.menu_item_id,
+            quantity=line.quantity,
+            price_at_sale=line.price_at_sale,
+            cost_at_sale=line.cost_at_sale
         )
-        db.add(order_item)
-        db.flush()  # Generate ID before using it
-        
-        # Decrement stock
-        recipe_items = db.query(MenuItemRecipe).filter(
-            MenuItemRecipe.menu_item_id == item_input.menu_item_id
-        ).all()
-        
-        for ingredient in recipe_items:
-            stock_item = db.query(StockItem).filter(
-                StockItem.id == ingredient.stock_item_id
-            ).first()
-            
-            if stock_item:
-                total_to_reduce = ingredient.quantity_used * item_input.quantity
-                stock_item.current_quantity -= total_to_reduce
-                db.add(stock_item)
-        
-        # Add to totals
-        total_revenue += price_entry.sale_price * item_input.quantity
-        total_cost += cost_per_item * item_input.quantity
-        
-        # Get menu item name
-        menu_item = db.query(MenuItem).filter(MenuItem.id == item_input.menu_item_id).first()
-        
-        items_response.append(OrderItemResponse(
+        for line in priced.lines
+    ]
+    db.add_all(order_items)
+    
+    # Decrement stock for all ingredients of the order in one UPDATE, and log it in one INSERT
+    usage = {stock_item_id: -quantity for stock_item_id, quantity in priced.stock_usage.items()}
+    apply_stock_deltas(db, usage)
+    record_stock_transactions(db, ledger_rows(
+        usage, StockTransactionType.usage,
+        notes=f"Order {new_order.id}",
+        created_by=user_id,
+        created_at=order_timestamp,
+        order_id=new_order.id
+    ))
+    
+    record_daily_summary(
+        db, cafe_id, sale_date,
+        revenue=priced.total_revenue,
+        cogs=priced.total_cost,
+        order_count=1
+    )
+    bump_resource_versions(db, cafe_id, Resource.stock)
+    
+    items_response = [
+        OrderItemResponse(
             id=order_item.id,
-            menu_item_id=item_input.menu_item_id,
-            menu_item_name=menu_item.name if menu_item else "Unknown",
-            quantity=item_input.quantity,
-            price_at_sale=price_entry.sale_price,
-            cost_at_sale=cost_per_item
-        ))
+            menu_item_id=line.menu_item_id,
+            menu_item_name=line.menu_item_name,
+            quantity=line.quantity,
+            price_at_sale=line.price_at_sale,
+            cost_at_sale=line.cost_at_sale
+        )
+        for order_item, line in zip(order_items, priced.lines)
+    ]
     
     db.commit()
-    db.refresh(new_order)
     
     return OrderResponse(
         id=new_order.id,
@@ -191,8 +250,74 @@ async def create_order(
         staff_name=staff.name,
         timestamp=order_timestamp,
         items=items_response,
-        total_revenue=total_revenue,
-        total_cost=total_cost
+        total_revenue=priced.total_revenue,
+        total_cost=priced.total_cost
+    )
+
+@router.post("/bulk", response_model=BulkOrderResult)
+async def create_orders_bulk(
+    cafe_id: UUID,
+    bulk_data: BulkOrderCreate,
+    dry_run: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Import many orders at once (e.g. end-of-day sales sheets); invalid rows are reported, not imported"""
+    await verify_cafe_access(cafe_id, current_user, db)
+    
+    orders = [
+        BulkOrder(
+            row=index,
+            staff_id=order.staff_id,
+            items=[(item.menu_item_id, item.quantity) for item in order.items],
+            timestamp=order.timestamp
+        )
+        for index, order in enumerate(bulk_data.orders)
+    ]
+    return await db.run_sync(_import_orders, cafe_id, orders, [], dry_run, current_user.id)
+
+@router.post("/bulk/csv", response_model=BulkOrderResult)
+async def create_orders_bulk_csv(
+    cafe_id: UUID,
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Import a CSV sales sheet (staff_id, menu_item_id, quantity[, timestamp]); errors are reported by line"""
+    await verify_cafe_access(cafe_id, current_user, db)
+    
+    content = await file.read(settings.MAX_UPLOAD_SIZE + 1)
+    if len(content) > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail="File too large")
+    
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+    
+    orders, parse_errors = parse_orders_csv(text)
+    if len(orders) > MAX_BULK_ORDERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ORDERS} orders per import")
+    
+    return await db.run_sync(_import_orders, cafe_id, orders, parse_errors, dry_run, current_user.id)
+
+def _import_orders(
+    db: Session, cafe_id: UUID, orders, parse_errors, dry_run: bool, user_id: UUID
+) -> BulkOrderResult:
+    """Run a bulk import and commit it unless it is a dry run"""
+    result = import_orders(db, cafe_id, orders, dry_run=dry_run, created_by=user_id)
+    if not dry_run:
+        db.commit()
+    
+    errors = sorted(parse_errors + result.errors, key=lambda error: error[0])
+    return BulkOrderResult(
+        created=len(result.order_ids),
+        order_ids=[] if dry_run else result.order_ids,
+        total_revenue=result.total_revenue,
+        total_cost=result.total_cost,
+        errors=[BulkOrderRowError(row=row, detail=detail) for row, detail in errors],
+        dry_run=dry_run
     )
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -200,11 +325,15 @@ async def delete_order_and_restock(
     cafe_id: UUID,
     order_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete an order and restore stock (UNDO feature)"""
     await verify_cafe_access(cafe_id, current_user, db, required_role="manager")
     
+    return await db.run_sync(_delete_order_and_restock, cafe_id, order_id, current_user.id)
+
+def _delete_order_and_restock(db: Session, cafe_id: UUID, order_id: UUID, user_id: UUID) -> None:
+    """Delete an order, restore its stock and take it out of the daily summary"""
     try:
         # Get the order
         order = db.query(Order).filter(
@@ -215,21 +344,25 @@ async def delete_order_and_restock(
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
         
-        # Begin transaction - restore stock for each item
-        for item in order.items:
-            recipe_items = db.query(MenuItemRecipe).filter(
-                MenuItemRecipe.menu_item_id == item.menu_item_id
-            ).all()
-            
-            for ingredient in recipe_items:
-                stock_item = db.query(StockItem).filter(
-                    StockItem.id == ingredient.stock_item_id
-                ).first()
-                
-                if stock_item:
-                    total_to_restore = ingredient.quantity_used * item.quantity
-                    stock_item.current_quantity += total_to_restore
-                    db.add(stock_item)
+        # Begin transaction - restore the stock the sale recorded (not today's recipes)
+        # in one UPDATE and log the exact reversal
+        restored = order_usage(db, order_id)
+        apply_stock_deltas(db, restored)
+        record_stock_transactions(db, ledger_rows(
+            restored, StockTransactionType.usage_reversal,
+            notes=f"Order {order_id} deleted",
+            created_by=user_id,
+            order_id=order_id
+        ))
+        
+        # Take the order back out of its day's summary
+        record_daily_summary(
+            db, cafe_id, business_day(order.timestamp),
+            revenue=-sum(item.price_at_sale * item.quantity for item in order.items),
+            cogs=-sum(item.cost_at_sale * item.quantity for item in order.items),
+            order_count=-1
+        )
+        bump_resource_versions(db, cafe_id, Resource.stock)
         
         # Delete the order (cascade will delete order_items)
         db.delete(order)
@@ -1,89 +1,61 @@
 from typing import List
 from uuid import UUID
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 import calendar
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.deps import get_current_user, verify_cafe_access
 from app.models.user import User
-from app.models.order import Order, OrderItem
-from app.models.staff import Staff, StaffSalaryHistory
-from app.models.expense import MonthlyExpense, DailyExpense
+from app.models.expense import MonthlyExpense
 from app.schemas.report import DailyReportResponse, MonthlyReportResponse
+from app.services.daily_summary import get_daily_summaries
+from app.services.salary import SalarySchedule
 
 router = APIRouter()
 
 def get_daily_salary_cost(db: Session, cafe_id: UUID, target_date: date) -> Decimal:
     """Calculate total salary cost for a specific day"""
-    total_salary = Decimal("0")
-    
-    staff_members = db.query(Staff).filter(
-        Staff.cafe_id == cafe_id,
-        Staff.is_active == True
-    ).all()
-    
-    for staff in staff_members:
-        # Get most recent salary valid for this date
-        salary = db.query(StaffSalaryHistory).filter(
-            StaffSalaryHistory.staff_id == staff.id,
-            StaffSalaryHistory.start_date <= target_date
-        ).order_by(StaffSalaryHistory.start_date.desc()).first()
-        
-        if salary:
-            total_salary += salary.daily_salary
-    
-    return total_salary
+    return SalarySchedule(db, cafe_id, until=target_date).total(target_date, target_date)
 
 def get_monthly_salary_cost(db: Session, cafe_id: UUID, month_date: date) -> Decimal:
     """Calculate total salary cost for an entire month"""
-    total_salary = Decimal("0")
+    month_start = month_date.replace(day=1)
     days_in_month = calendar.monthrange(month_date.year, month_date.month)[1]
+    month_end = month_start.replace(day=days_in_month)
     
-    # Sum up daily salaries for each day of the month
-    for day in range(1, days_in_month + 1):
-        current_date = month_date.replace(day=day)
-        total_salary += get_daily_salary_cost(db, cafe_id, current_date)
-    
-    return total_salary
+    return SalarySchedule(db, cafe_id, until=month_end).total(month_start, month_end)
 
 @router.get("/daily", response_model=DailyReportResponse)
 async def get_daily_report(
     cafe_id: UUID,
     date: date,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get comprehensive daily profit report"""
     await verify_cafe_access(cafe_id, current_user, db)
     
-    # Define day boundaries
-    start_of_day = datetime.combine(date, datetime.min.time())
-    end_of_day = datetime.combine(date, datetime.max.time())
-    
-    # 1. Get Revenue and COGS
-    order_items = db.query(OrderItem).join(Order).filter(
-        Order.cafe_id == cafe_id,
-        Order.timestamp >= start_of_day,
-        Order.timestamp <= end_of_day
-    ).all()
-    
-    total_revenue = sum(item.price_at_sale * item.quantity for item in order_items)
-    total_cogs = sum(item.cost_at_sale * item.quantity for item in order_items)
+    return await db.run_sync(build_daily_report, cafe_id, date)
+
+def build_daily_report(db: Session, cafe_id: UUID, date: date) -> DailyReportResponse:
+    """Profit report of a cafe for one day"""
+    # 1. Get Revenue, COGS and Daily Expenses from the daily summary
+    summary = get_daily_summaries(db, cafe_id, date, date).get(date)
+    
+    total_revenue = summary.revenue if summary else Decimal("0")
+    total_cogs = summary.cogs if summary else Decimal("0")
+    daily_expenses_sum = summary.daily_expenses if summary else Decimal("0")
+    waste_cost = summary.waste_cost if summary else Decimal("0")
     gross_profit = total_revenue - total_cogs
     
     # 2. Get Daily Salaries
     total_salaries = get_daily_salary_cost(db, cafe_id, date)
     
-    # 3. Get Daily Expenses
-    daily_expenses_sum = db.query(func.sum(DailyExpense.amount)).filter(
-        DailyExpense.cafe_id == cafe_id,
-        DailyExpense.date == date
-    ).scalar() or Decimal("0")
-    
-    # 4. Get Pro-rated Monthly Expenses
+    # 3. Get Pro-rated Monthly Expenses
     days_in_month = calendar.monthrange(date.year, date.month)[1]
     month_start = date.replace(day=1)
     
@@ -94,7 +66,7 @@ async def get_daily_report(
     
     pro_rated_monthly = monthly_expenses_sum / Decimal(str(days_in_month))
     
-    # 5. Calculate Net Profit
+    # 4. Calculate Net Profit
     total_costs = total_salaries + daily_expenses_sum + pro_rated_monthly
     net_profit = gross_profit - total_costs
     
@@ -107,7 +79,8 @@ async def get_daily_report(
             "salaries": float(total_salaries),
             "daily_expenses": float(daily_expenses_sum),
             "pro_rated_monthly_expenses": float(pro_rated_monthly),
-            "total_costs": float(total_costs)
+            "total_costs": float(total_costs),
+            "waste": float(waste_cost)  # Informational, not part of total_costs
         },
         net_profit=net_profit
     )
@@ -117,11 +90,15 @@ async def get_monthly_report(
     cafe_id: UUID,
     month: date,  # Should be first day of month
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get comprehensive monthly profit report"""
     await verify_cafe_access(cafe_id, current_user, db)
     
+    return await db.run_sync(build_monthly_report, cafe_id, month)
+
+def build_monthly_report(db: Session, cafe_id: UUID, month: date) -> MonthlyReportResponse:
+    """Profit report of a cafe for a month, with a daily breakdown"""
     # Ensure month is first day
     month_start = month.replace(day=1)
     
@@ -131,22 +108,18 @@ async def get_monthly_report(
     else:
         month_end = month_start.replace(month=month_start.month + 1, day=1) - timedelta(days=1)
     
-    start_of_month = datetime.combine(month_start, datetime.min.time())
-    end_of_month = datetime.combine(month_end, datetime.max.time())
-    
-    # 1. Get Revenue and COGS
-    order_items = db.query(OrderItem).join(Order).filter(
-        Order.cafe_id == cafe_id,
-        Order.timestamp >= start_of_month,
-        Order.timestamp <= end_of_month
-    ).all()
+    # 1. Get Revenue and COGS from the daily summary, one row per active day
+    summaries = get_daily_summaries(db, cafe_id, month_start, month_end)
     
-    total_revenue = sum(item.price_at_sale * item.quantity for item in order_items)
-    total_cogs = sum(item.cost_at_sale * item.quantity for item in order_items)
+    total_revenue = sum((summary.revenue for summary in summaries.values()), Decimal("0"))
+    total_cogs = sum((summary.cogs for summary in summaries.values()), Decimal("0"))
+    total_waste = sum((summary.waste_cost for summary in summaries.values()), Decimal("0"))
     gross_profit = total_revenue - total_cogs
     
-    # 2. Get Monthly Salaries
-    total_salaries = get_monthly_salary_cost(db, cafe_id, month_start)
+    # 2. Get Monthly Salaries (one history load serves the total and the daily breakdown)
+    salary_schedule = SalarySchedule(db, cafe_id, until=month_end)
+    daily_salaries = salary_schedule.daily_totals(month_start, month_end)
+    total_salaries = sum(daily_salaries.values(), Decimal("0"))
     
     # 3. Get Monthly Expenses
     monthly_expenses_sum = db.query(func.sum(MonthlyExpense.amount)).filter(
@@ -159,38 +132,21 @@ async def get_monthly_report(
     net_profit = gross_profit - total_costs
 
     # 5. Calculate Daily Breakdown
-    daily_stats = {}
     days_in_month = calendar.monthrange(month_start.year, month_start.month)[1]
-    
-    # Initialize all days
-    for day in range(1, days_in_month + 1):
-        current_date = month_start.replace(day=day)
-        daily_stats[current_date] = {
-            "revenue": Decimal("0"),
-            "cogs": Decimal("0")
-        }
-
-    # Aggregate revenue/cogs from orders
-    for item in order_items:
-        order_date = item.order.timestamp.date()
-        if order_date in daily_stats:
-            daily_stats[order_date]["revenue"] += item.price_at_sale * item.quantity
-            daily_stats[order_date]["cogs"] += item.cost_at_sale * item.quantity
 
     daily_reports_list = []
     for day in range(1, days_in_month + 1):
         current_date = month_start.replace(day=day)
-        stats = daily_stats[current_date]
+        summary = summaries.get(current_date)
+        revenue = summary.revenue if summary else Decimal("0")
+        cogs = summary.cogs if summary else Decimal("0")
         
         # Get daily costs
-        daily_salary = get_daily_salary_cost(db, cafe_id, current_date)
-        daily_expense = db.query(func.sum(DailyExpense.amount)).filter(
-            DailyExpense.cafe_id == cafe_id,
-            DailyExpense.date == current_date
-        ).scalar() or Decimal("0")
+        daily_salary = daily_salaries[current_date]
+        daily_expense = summary.daily_expenses if summary else Decimal("0")
         
         # Gross Profit
-        gross = stats["revenue"] - stats["cogs"]
+        gross = revenue - cogs
         
         # Net Profit (Daily) - excluding monthly pro-rated for chart clarity, or include it?
         # Let's include pro-rated monthly expenses to match the total monthly profit logic roughly
@@ -199,7 +155,7 @@ async def get_monthly_report(
         
         daily_reports_list.append({
             "date": current_date,
-            "revenue": stats["revenue"],
+            "revenue": revenue,
             "profit": net
         })
     
@@ -211,7 +167,8 @@ async def get_monthly_report(
         costs={
             "salaries": float(total_salaries),
             "monthly_expenses": float(monthly_expenses_sum),
-            "total_costs": float(total_costs)
+            "total_costs": float(total_costs),
+            "waste": float(total_waste)  # Informational, not part of total_costs
         },
         net_profit=net_profit,
         daily_reports=daily_reports_list
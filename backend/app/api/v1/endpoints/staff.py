@@ -1,12 +1,16 @@
 from typing import List
 from uuid import UUID
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.deps import get_current_user, verify_cafe_access
+from app.core.http_cache import check_etag
 from app.models.user import User
 from app.models.staff import Staff, StaffSalaryHistory
+from app.services.history import latest_as_of
+from app.services.resource_versions import Resource, bump_resource_versions, resource_etag
 from app.schemas.staff import (
     StaffCreate, StaffUpdate, StaffResponse,
     StaffSalaryHistoryCreate, StaffSalaryHistoryResponse
@@ -17,27 +21,36 @@ router = APIRouter()
 @router.get("", response_model=List[StaffResponse])
 async def get_staff(
     cafe_id: UUID,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all staff for a cafe"""
+    """Get all staff for a cafe (ETag, 304 if unchanged)"""
     await verify_cafe_access(cafe_id, current_user, db)
     
+    # Current salaries are the latest history rows, so no date is part of the tag
+    check_etag(request, response, resource_etag(db, cafe_id, Resource.staff))
+    
     staff_list = db.query(Staff).filter(Staff.cafe_id == cafe_id).order_by(Staff.name).all()
     
+    staff_ids = [staff_member.id for staff_member in staff_list]
+    
+    # Current salary (most recent salary history) of every staff member
+    current_salaries = latest_as_of(
+        db, StaffSalaryHistory.staff_id, StaffSalaryHistory.daily_salary, staff_ids
+    )
+    
+    # Hire date (earliest salary history) of every staff member
+    hire_dates = dict(db.query(
+        StaffSalaryHistory.staff_id, func.min(StaffSalaryHistory.start_date)
+    ).filter(
+        StaffSalaryHistory.staff_id.in_(staff_ids)
+    ).group_by(StaffSalaryHistory.staff_id).all()) if staff_ids else {}
+    
     # Add current_salary and hire_date from salary history
     result = []
     for staff_member in staff_list:
-        # Get current salary (most recent salary history)
-        current_salary_record = db.query(StaffSalaryHistory).filter(
-            StaffSalaryHistory.staff_id == staff_member.id
-        ).order_by(StaffSalaryHistory.start_date.desc()).first()
-        
-        # Get hire date (earliest salary history)
-        hire_date_record = db.query(StaffSalaryHistory).filter(
-            StaffSalaryHistory.staff_id == staff_member.id
-        ).order_by(StaffSalaryHistory.start_date.asc()).first()
-        
         staff_dict = {
             "id": staff_member.id,
             "cafe_id": staff_member.cafe_id,
@@ -47,8 +60,8 @@ async def get_staff(
             "phone": staff_member.phone,
             "is_active": staff_member.is_active,
             "created_at": staff_member.created_at,
-            "current_salary": current_salary_record.daily_salary if current_salary_record else None,
-            "hire_date": hire_date_record.start_date if hire_date_record else staff_member.created_at.date()
+            "current_salary": current_salaries.get(staff_member.id),
+            "hire_date": hire_dates.get(staff_member.id) or staff_member.created_at.date()
         }
         result.append(StaffResponse(**staff_dict))
     
@@ -94,6 +107,7 @@ async def create_staff(
         start_date=date.today()
     )
     db.add(salary)
+    bump_resource_versions(db, cafe_id, Resource.staff)
     db.commit()
     db.refresh(new_staff)
     
@@ -127,6 +141,7 @@ async def update_staff(
     if staff_data.phone is not None:
         staff.phone = staff_data.phone
     
+    bump_resource_versions(db, cafe_id, Resource.staff)
     db.commit()
     db.refresh(staff)
     
@@ -157,6 +172,7 @@ async def update_staff_salary(
         start_date=salary_data.start_date or date.today()
     )
     db.add(new_salary)
+    bump_resource_versions(db, cafe_id, Resource.staff)
     db.commit()
     db.refresh(new_salary)
     
@@ -181,4 +197,5 @@ async def delete_staff(
         raise HTTPException(status_code=404, detail="Staff member not found")
     
     db.delete(staff)
+    bump_resource_versions(db, cafe_id, Resource.staff)
     db.commit()
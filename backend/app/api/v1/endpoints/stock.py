@@ -1,71 +1,229 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
-from datetime import date
+from datetime import date, datetime, timedelta
 from decimal import Decimal
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy import func, tuple_
+from app.core.database import get_async_db, get_db
 from app.core.deps import get_current_user, verify_cafe_access
+from app.core.http_cache import check_etag
+from app.core.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
 from app.models.user import User
-from app.models.stock import StockItem, StockCostHistory, StockTransaction
+from app.models.stock import StockItem, StockCostHistory, StockTransaction, StockTransactionType
+from app.models.menu import MenuItemRecipe
+from app.models.order import Order, OrderItem
 from app.schemas.stock import (
     StockItemCreate, StockItemUpdate, StockItemResponse,
     StockCostHistoryCreate, StockCostHistoryResponse,
     RestockRequest, StockTransactionResponse, WasteRequest,
-    StockTransactionWithItemResponse
+    StockTransactionWithItemResponse, StockTransactionPage, StockLevelResponse
 )
+from app.services.daily_summary import business_day, business_day_start, business_timestamp
+from app.services.exports import EXPORT_ENCODERS, ExportFormat, parquet_available, stream_query
+from app.services.history import as_of_query, latest_as_of
+from app.services.menu_costs import menu_items_using, refresh_menu_item_costs
+from app.services.pricing import recipe_cost_cache
+from app.services.resource_versions import Resource, bump_resource_versions, resource_etag
+from app.services.stock_ledger import LEDGER_COLUMNS, apply_stock_deltas, ledger_query, stock_levels
+from app.services.stock_snapshots import take_stock_snapshots
 
 router = APIRouter()
 
 @router.get("/history", response_model=List[StockTransactionWithItemResponse])
 async def get_all_stock_history(
     cafe_id: UUID,
+    transaction_type: Optional[List[StockTransactionType]] = Query(None),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    created_by: Optional[UUID] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all stock history for a cafe"""
+    """Get the latest stock transactions of a cafe (use /ledger to page further back)"""
     await verify_cafe_access(cafe_id, current_user, db)
     
-    # Join with StockItem to filter by cafe_id
-    history = db.query(StockTransaction).join(StockItem).filter(
-        StockItem.cafe_id == cafe_id
-    ).order_by(StockTransaction.created_at.desc()).limit(100).all()
+    query = ledger_query(
+        cafe_id, transaction_types=transaction_type, start_date=start_date,
+        end_date=end_date, created_by=created_by
+    )
+    return await db.run_sync(_ledger_rows, query, limit)
+
+@router.get("/ledger", response_model=StockTransactionPage)
+async def get_stock_ledger(
+    cafe_id: UUID,
+    cursor: Optional[str] = None,
+    page_size: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    stock_item_id: Optional[UUID] = None,
+    transaction_type: Optional[List[StockTransactionType]] = Query(None),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    created_by: Optional[UUID] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get stock transactions newest first, one page at a time (pass next_cursor to continue)"""
+    await verify_cafe_access(cafe_id, current_user, db)
     
-    # Map to response schema with item name
-    result = []
-    for trans in history:
-        result.append(StockTransactionWithItemResponse(
-            id=trans.id,
-            stock_item_id=trans.stock_item_id,
-            quantity_change=trans.quantity_change,
-            transaction_type=trans.transaction_type,
-            notes=trans.notes,
-            created_at=trans.created_at,
-            created_by=trans.created_by,
-            stock_item_name=trans.stock_item.name
-        ))
+    query = ledger_query(
+        cafe_id, stock_item_id=stock_item_id, transaction_types=transaction_type,
+        start_date=start_date, end_date=end_date, created_by=created_by
+    )
+    if cursor:
+        after_created_at, after_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(StockTransaction.created_at, StockTransaction.id) < tuple_(after_created_at, after_id)
+        )
     
-    return result
+    # Fetch one extra row to know whether another page follows
+    rows = await db.run_sync(_ledger_rows, query, page_size + 1)
+    
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    
+    return StockTransactionPage(items=rows, next_cursor=next_cursor)
+
+@router.get("/ledger/export")
+async def export_stock_ledger(
+    cafe_id: UUID,
+    stock_item_id: Optional[UUID] = None,
+    transaction_type: Optional[List[StockTransactionType]] = Query(None),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    created_by: Optional[UUID] = None,
+    format: ExportFormat = ExportFormat.csv,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stream every matching stock transaction, oldest first, as CSV, NDJSON or Parquet"""
+    await verify_cafe_access(cafe_id, current_user, db)
+    
+    if format == ExportFormat.parquet and not parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parquet export requires pyarrow to be installed"
+        )
+    
+    query = ledger_query(
+        cafe_id, stock_item_id=stock_item_id, transaction_types=transaction_type,
+        start_date=start_date, end_date=end_date, created_by=created_by
+    ).order_by(StockTransaction.created_at, StockTransaction.id)
+    
+    return StreamingResponse(
+        stream_query(query, LEDGER_COLUMNS, format),
+        media_type=EXPORT_ENCODERS[format].media_type,
+        headers={"Content-Disposition": f'attachment; filename="stock_ledger.{format.value}"'}
+    )
+
+def _ledger_rows(db: Session, query, limit: int) -> List[dict]:
+    """Newest rows of a ledger_query, as dicts"""
+    rows = db.execute(
+        query.order_by(StockTransaction.created_at.desc(), StockTransaction.id.desc()).limit(limit)
+    )
+    return [dict(row._mapping) for row in rows]
+
+@router.get("/levels", response_model=List[StockLevelResponse])
+async def get_stock_levels(
+    cafe_id: UUID,
+    at: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get every stock item's quantity at a point in time (default now; naive times are BUSINESS_TIMEZONE), rebuilt from the ledger"""
+    await verify_cafe_access(cafe_id, current_user, db)
+    
+    rows = await db.run_sync(stock_levels, cafe_id, business_timestamp(at))
+    return [
+        StockLevelResponse(
+            stock_item_id=stock_item_id,
+            name=name,
+            unit_of_measure=unit_of_measure,
+            quantity=quantity_at,
+            current_quantity=current_quantity,
+            ledger_drift=current_quantity - ledger_balance
+        )
+        for stock_item_id, name, unit_of_measure, current_quantity, quantity_at, ledger_balance in rows
+    ]
+
+@router.post("/snapshots")
+async def create_stock_snapshots(
+    cafe_id: UUID,
+    at: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Snapshot every stock item's ledger balance at a point in time (default start of the business day)"""
+    await verify_cafe_access(cafe_id, current_user, db, required_role="manager")
+    
+    snapshot_at = business_timestamp(at) if at else business_day_start(business_day())
+    try:
+        written = take_stock_snapshots(db, snapshot_at, cafe_id=cafe_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    db.commit()
+    
+    return {"message": "Stock snapshot taken", "snapshot_at": snapshot_at, "snapshots": written}
 
 @router.get("", response_model=List[StockItemResponse])
 async def get_stock_items(
     cafe_id: UUID,
+    request: Request,
+    response: Response,
+    usage_days: int = Query(14, ge=1, le=90),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all stock items for a cafe"""
+    """Get all stock items for a cafe with value, low-stock flag and days of cover (ETag, 304 if unchanged)"""
     await verify_cafe_access(cafe_id, current_user, db)
     
-    items = db.query(StockItem).filter(StockItem.cafe_id == cafe_id).order_by(StockItem.name).all()
+    # Costs and the usage window are as of today, so the tag changes daily too
+    etag = await db.run_sync(resource_etag, cafe_id, Resource.stock, usage_days, date.today(), business_day())
+    check_etag(request, response, etag)
+    
+    return await db.run_sync(_list_stock_items, cafe_id, usage_days)
+
+def _list_stock_items(db: Session, cafe_id: UUID, usage_days: int) -> List[dict]:
+    """Stock items of a cafe with current cost and usage-based figures"""
+    today = date.today()
+    # The last usage_days complete business days, so the average isn't inflated by today so far
+    usage_end = business_day()
+    usage_since = business_day_start(usage_end - timedelta(days=usage_days))
+    usage_until = business_day_start(usage_end)
+    
+    # Current cost of every stock item of the cafe
+    current_cost = as_of_query(
+        db, StockCostHistory.stock_item_id, StockCostHistory.cost_per_unit, on_date=today
+    ).join(StockItem).filter(StockItem.cafe_id == cafe_id).subquery()
+    
+    # Quantity consumed by sales over the usage window
+    recent_usage = db.query(
+        MenuItemRecipe.stock_item_id,
+        func.sum(MenuItemRecipe.quantity_used * OrderItem.quantity).label("used")
+    ).join(
+        OrderItem, OrderItem.menu_item_id == MenuItemRecipe.menu_item_id
+    ).join(Order).filter(
+        Order.cafe_id == cafe_id,
+        Order.timestamp >= usage_since,
+        Order.timestamp < usage_until
+    ).group_by(MenuItemRecipe.stock_item_id).subquery()
+    
+    rows = db.query(
+        StockItem, current_cost.c.cost_per_unit, recent_usage.c.used
+    ).outerjoin(
+        current_cost, current_cost.c.stock_item_id == StockItem.id
+    ).outerjoin(
+        recent_usage, recent_usage.c.stock_item_id == StockItem.id
+    ).filter(StockItem.cafe_id == cafe_id).order_by(StockItem.name).all()
     
-    # Attach current cost to each item
     result = []
-    for item in items:
-        # Get the most recent cost
-        cost_entry = db.query(StockCostHistory).filter(
-            StockCostHistory.stock_item_id == item.id,
-            StockCostHistory.start_date <= date.today()
-        ).order_by(StockCostHistory.start_date.desc()).first()
+    for item, cost_per_unit, used in rows:
+        cost_per_unit = cost_per_unit if cost_per_unit is not None else Decimal("0")
+        avg_daily_usage = round(used / usage_days, 3) if used else None
         
         item_dict = {
             "id": item.id,
@@ -74,8 +232,12 @@ async def get_stock_items(
             "unit_of_measure": item.unit_of_measure,
             "low_stock_threshold": item.low_stock_threshold,
             "current_quantity": item.current_quantity,
-            "cost_per_unit": cost_entry.cost_per_unit if cost_entry else 0,
-            "created_at": item.created_at
+            "cost_per_unit": cost_per_unit,
+            "created_at": item.created_at,
+            "stock_value": round(item.current_quantity * cost_per_unit, 2),
+            "is_low_stock": item.current_quantity <= (item.low_stock_threshold or 0),
+            "avg_daily_usage": avg_daily_usage,
+            "days_of_cover": round(item.current_quantity / avg_daily_usage, 1) if avg_daily_usage else None
         }
         result.append(item_dict)
     
@@ -132,6 +294,7 @@ async def create_stock_item(
         )
         db.add(transaction)
 
+    bump_resource_versions(db, cafe_id, Resource.stock)
     db.commit()
     db.refresh(new_item)
     
@@ -163,13 +326,14 @@ async def update_stock_item(
     if item_data.low_stock_threshold is not None:
         item.low_stock_threshold = item_data.low_stock_threshold
     
+    bump_resource_versions(db, cafe_id, Resource.stock)
     db.commit()
     db.refresh(item)
     
     # Get current cost from history
-    current_cost = db.query(StockCostHistory).filter(
-        StockCostHistory.stock_item_id == item_id
-    ).order_by(StockCostHistory.start_date.desc()).first()
+    current_cost = latest_as_of(
+        db, StockCostHistory.stock_item_id, StockCostHistory.cost_per_unit, [item_id]
+    ).get(item_id)
     
     response = StockItemResponse(
         id=item.id,
@@ -178,7 +342,7 @@ async def update_stock_item(
         unit_of_measure=item.unit_of_measure,
         current_quantity=item.current_quantity,
         low_stock_threshold=item.low_stock_threshold,
-        cost_per_unit=current_cost.cost_per_unit if current_cost else Decimal("0"),
+        cost_per_unit=current_cost if current_cost is not None else Decimal("0"),
         created_at=item.created_at
     )
     
@@ -209,8 +373,12 @@ async def update_stock_cost(
         start_date=cost_data.start_date or date.today()
     )
     db.add(new_cost)
+    db.flush()
+    refresh_menu_item_costs(db, menu_items_using(db, [item_id]))
+    bump_resource_versions(db, cafe_id, Resource.stock, Resource.menu, Resource.costs)
     db.commit()
     db.refresh(new_cost)
+    recipe_cost_cache.invalidate_stock_items([item_id])
     
     return new_cost
 
@@ -233,22 +401,26 @@ async def restock_item(
     if not item:
         raise HTTPException(status_code=404, detail="Stock item not found")
     
-    item.current_quantity += restock_data.quantity
+    new_quantity = apply_stock_deltas(db, {item_id: restock_data.quantity})[item_id]
     
     # Update cost if provided
+    cost_changed = False
     if restock_data.cost_per_unit is not None:
         # Check if cost actually changed to avoid duplicate entries for same day
-        current_cost = db.query(StockCostHistory).filter(
-            StockCostHistory.stock_item_id == item_id
-        ).order_by(StockCostHistory.start_date.desc()).first()
+        current_cost = latest_as_of(
+            db, StockCostHistory.stock_item_id, StockCostHistory.cost_per_unit, [item_id]
+        ).get(item_id)
         
-        if not current_cost or current_cost.cost_per_unit != restock_data.cost_per_unit:
+        if current_cost is None or current_cost != restock_data.cost_per_unit:
             new_cost = StockCostHistory(
                 stock_item_id=item_id,
                 cost_per_unit=restock_data.cost_per_unit,
                 start_date=date.today()
             )
             db.add(new_cost)
+            db.flush()
+            refresh_menu_item_costs(db, menu_items_using(db, [item_id]))
+            cost_changed = True
     
     # Create transaction record
     transaction = StockTransaction(
@@ -260,9 +432,13 @@ async def restock_item(
     )
     db.add(transaction)
     
+    # Costs feed menu margins too
+    bump_resource_versions(db, cafe_id, Resource.stock, *([Resource.menu, Resource.costs] if cost_changed else []))
     db.commit()
+    if cost_changed:
+        recipe_cost_cache.invalidate_stock_items([item_id])
     
-    return {"message": "Stock updated successfully", "new_quantity": float(item.current_quantity)}
+    return {"message": "Stock updated successfully", "new_quantity": float(new_quantity)}
 
 @router.post("/{item_id}/waste")
 async def record_waste(
@@ -282,12 +458,14 @@ async def record_waste(
     
     if not item:
         raise HTTPException(status_code=404, detail="Stock item not found")
-    
-    if item.current_quantity < waste_data.quantity:
+
+    # Decrement in the database like orders do; the check uses the quantity after
+    # every concurrent change, and the row stays locked until commit or rollback
+    new_quantity = apply_stock_deltas(db, {item_id: -waste_data.quantity})[item_id]
+    if new_quantity < 0:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Not enough stock to record waste")
-    
-    item.current_quantity -= waste_data.quantity
-    
+
     # Create transaction record
     transaction = StockTransaction(
         stock_item_id=item_id,
@@ -298,33 +476,54 @@ async def record_waste(
     )
     db.add(transaction)
     
+    bump_resource_versions(db, cafe_id, Resource.stock)
     db.commit()
     
-    return {"message": "Waste recorded successfully", "new_quantity": float(item.current_quantity)}
+    return {"message": "Waste recorded successfully", "new_quantity": float(new_quantity)}
 
 @router.get("/{item_id}/history", response_model=List[StockTransactionResponse])
 async def get_stock_history(
     cafe_id: UUID,
     item_id: UUID,
+    transaction_type: Optional[List[StockTransactionType]] = Query(None),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    created_by: Optional[UUID] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get stock history for an item"""
+    """Get the latest stock transactions of an item (use /ledger?stock_item_id= to page further back)"""
     await verify_cafe_access(cafe_id, current_user, db)
     
-    item = db.query(StockItem).filter(
+    return await db.run_sync(
+        _item_history, cafe_id, item_id, transaction_type, start_date, end_date, created_by, limit
+    )
+
+def _item_history(
+    db: Session,
+    cafe_id: UUID,
+    item_id: UUID,
+    transaction_type: Optional[List[StockTransactionType]],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    created_by: Optional[UUID],
+    limit: int
+) -> List[dict]:
+    """Latest transactions of one stock item of the cafe"""
+    item_exists = db.query(StockItem.id).filter(
         StockItem.id == item_id,
         StockItem.cafe_id == cafe_id
     ).first()
     
-    if not item:
+    if not item_exists:
         raise HTTPException(status_code=404, detail="Stock item not found")
-        
-    history = db.query(StockTransaction).filter(
-        StockTransaction.stock_item_id == item_id
-    ).order_by(StockTransaction.created_at.desc()).all()
     
-    return history
+    query = ledger_query(
+        cafe_id, stock_item_id=item_id, transaction_types=transaction_type,
+        start_date=start_date, end_date=end_date, created_by=created_by
+    )
+    return _ledger_rows(db, query, limit)
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_stock_item(
@@ -344,5 +543,11 @@ async def delete_stock_item(
     if not item:
         raise HTTPException(status_code=404, detail="Stock item not found")
     
+    # Menu items losing this ingredient get their cost recomputed
+    affected_menu_items = menu_items_using(db, [item_id])
     db.delete(item)
+    db.flush()
+    refresh_menu_item_costs(db, affected_menu_items)
+    bump_resource_versions(db, cafe_id, Resource.stock, Resource.menu, Resource.costs)
     db.commit()
+    recipe_cost_cache.invalidate_stock_items([item_id])
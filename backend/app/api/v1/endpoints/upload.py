@@ -1,73 +1,99 @@
+from typing import Dict, List, Optional
 from fastapi import APIRouter, UploadFile, File, HTTPException, Body
-import shutil
-import os
+from fastapi.concurrency import run_in_threadpool
 import uuid
 from app.core.config import settings
-from supabase import create_client, Client
+from app.core.storage import StorageBackend, get_storage
+from app.services.images import EncodedImage, InvalidImageError, generate_variants, variant_map
 
 router = APIRouter()
 
-def get_supabase_client():
-    if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
-        raise HTTPException(status_code=500, detail="Supabase storage is not configured")
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+# Bytes read from the spooled request body per await
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Variant files are named by content hash and never change
+VARIANT_CACHE_SECONDS = 365 * 24 * 3600
+
+async def read_upload(file: UploadFile) -> bytes:
+    """Read an uploaded file in chunks, rejecting it as soon as it passes MAX_UPLOAD_SIZE"""
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"File is larger than the {settings.MAX_UPLOAD_SIZE} byte upload limit"
+    )
+    if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+        raise too_large
+
+    content = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        content.extend(chunk)
+        if len(content) > settings.MAX_UPLOAD_SIZE:
+            raise too_large
+    return bytes(content)
+
+def _store_images(storage: StorageBackend, images: List[EncodedImage]) -> Dict[str, str]:
+    """
+    Store encoded variants under a fresh upload directory, so deleting one menu
+    item's image never removes another's. Returns URLs by filename.
+    """
+    upload_id = uuid.uuid4().hex
+    urls = {}
+    for image in images:
+        if image.filename not in urls:
+            urls[image.filename] = storage.put(
+                f"{upload_id}/{image.filename}", image.data, image.media_type,
+                cache_seconds=VARIANT_CACHE_SECONDS
+            )
+    return urls
 
 @router.post("/", response_model=dict)
 async def upload_file(file: UploadFile = File(...)):
+    """
+    Upload a menu image.
+
+    The image is resized to thumbnail, card and full variants encoded as WebP
+    (and AVIF when available) with content-hash filenames. Returns the full
+    WebP variant as url/filename and every stored variant under variants, to
+    be saved as the menu item's image_variants.
+    """
+    file_content = await read_upload(file)
+
     try:
-        # Generate unique filename
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        
-        try:
-            # Initialize Supabase client
-            supabase = get_supabase_client()
-            
-            # Read file content
-            file_content = await file.read()
-            
-            # Upload to Supabase Storage
-            bucket_name = "menu-items"
-            
-            # Upload
-            res = supabase.storage.from_(bucket_name).upload(
-                path=unique_filename,
-                file=file_content,
-                file_options={"content-type": file.content_type}
-            )
-            
-            # Get Public URL
-            public_url = supabase.storage.from_(bucket_name).get_public_url(unique_filename)
-            
-            return {"url": public_url, "filename": unique_filename}
-            
-        except Exception as e:
-            print(f"Supabase upload failed: {e}")
-            # If it's a timeout or connection error, give more details
-            raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
-            
-    except HTTPException as he:
-        raise he
+        images = await generate_variants(file_content)
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # The SDK and file writes block, so keep them off the event loop
+        urls = await run_in_threadpool(_store_images, get_storage(), images)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        print(f"Image upload failed: {e}")
+        # If it's a timeout or connection error, give more details
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+    variants = variant_map(images, urls)
+    full = variants["full"]["webp"]
+    return {"url": full, "filename": get_storage().name_from_url(full), "variants": variants}
 
 @router.delete("/", response_model=dict)
-async def delete_file(filename: str = Body(..., embed=True)):
+async def delete_file(
+    filename: str = Body(..., embed=True),
+    variants: Optional[Dict[str, dict]] = Body(None, embed=True)
+):
+    """Delete an uploaded file, and the variant files when the item's image_variants are given"""
+    urls = [filename] + [
+        url for variant in (variants or {}).values()
+        for key, url in variant.items() if key not in ("width", "height")
+    ]
+    storage = get_storage()
     try:
-        # Initialize Supabase client
-        supabase = get_supabase_client()
-        bucket_name = "menu-items"
-        
-        # Extract filename from URL if full URL is provided
-        if filename.startswith("http"):
-            filename = filename.split("/")[-1]
-            
-        # Delete from Supabase Storage
-        res = supabase.storage.from_(bucket_name).remove([filename])
-        
+        # Extract the stored name if a full URL or /uploads path is provided
+        names = list(dict.fromkeys(storage.name_from_url(url) for url in urls))
+        await run_in_threadpool(storage.delete, names)
+
         return {"message": "File deleted successfully"}
-        
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"Supabase delete failed: {e}")
+        print(f"Image delete failed: {e}")
         raise HTTPException(status_code=500, detail=f"Delete failed: {str(e)}")
-
@@ -2,11 +2,15 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
-from datetime import date
+from decimal import Decimal
 from app.core import deps
-from app.models.menu import MenuItem, MenuItemRecipe, MenuWaste
-from app.models.stock import StockItem, StockTransaction, StockCostHistory
+from app.models.menu import MenuItem, MenuWaste
+from app.models.stock import StockTransaction
 from app.schemas.waste import MenuWasteCreate, MenuWasteResponse
+from app.services.daily_summary import business_day, record_daily_summary
+from app.services.pricing import OrderPricer
+from app.services.resource_versions import Resource, bump_resource_versions
+from app.services.stock_ledger import apply_stock_deltas
 
 router = APIRouter()
 
@@ -23,39 +27,31 @@ def record_menu_waste(
     if not menu_item:
         raise HTTPException(status_code=404, detail="Menu item not found")
 
-    # 2. Get Recipe
-    recipe_items = db.query(MenuItemRecipe).filter(MenuItemRecipe.menu_item_id == menu_item.id).all()
+    # 2. Get Recipe and current ingredient costs
+    waste_day = business_day()
+    pricer = OrderPricer(db, [menu_item.id], waste_day)
+    waste_quantity = Decimal(str(waste_in.quantity))
     
-    total_cost = 0
+    total_cost = pricer.cost(menu_item.id) * waste_quantity
     
     # 3. Process Ingredients
-    for recipe_item in recipe_items:
-        stock_item = db.query(StockItem).filter(StockItem.id == recipe_item.stock_item_id).first()
-        if stock_item:
-            quantity_needed = float(recipe_item.quantity_used) * waste_in.quantity
-            
-            # Get current cost
-            cost_entry = db.query(StockCostHistory).filter(
-                StockCostHistory.stock_item_id == stock_item.id,
-                StockCostHistory.start_date <= date.today()
-            ).order_by(StockCostHistory.start_date.desc()).first()
-            
-            cost_per_unit = float(cost_entry.cost_per_unit) if cost_entry else 0
-            cost = cost_per_unit * quantity_needed
-            total_cost += cost
-            
-            # Deduct Stock
-            stock_item.current_quantity = float(stock_item.current_quantity) - quantity_needed
-            
-            # Record Transaction
-            transaction = StockTransaction(
-                stock_item_id=stock_item.id,
-                quantity_change=-quantity_needed,
-                transaction_type='waste',
-                notes=f"Waste: {waste_in.quantity}x {menu_item.name} ({waste_in.reason or 'No reason'})",
-                created_by=current_user.id
-            )
-            db.add(transaction)
+    usage = {}
+    for stock_item_id, quantity_used in pricer.recipe(menu_item.id):
+        quantity_needed = quantity_used * waste_quantity
+        usage[stock_item_id] = usage.get(stock_item_id, Decimal("0")) + quantity_needed
+        
+        # Record Transaction
+        transaction = StockTransaction(
+            stock_item_id=stock_item_id,
+            quantity_change=-quantity_needed,
+            transaction_type='waste',
+            notes=f"Waste: {waste_in.quantity}x {menu_item.name} ({waste_in.reason or 'No reason'})",
+            created_by=current_user.id
+        )
+        db.add(transaction)
+    
+    # Deduct Stock
+    apply_stock_deltas(db, {stock_item_id: -quantity for stock_item_id, quantity in usage.items()})
             
     # 4. Create Waste Record
     waste_record = MenuWaste(
@@ -67,6 +63,8 @@ def record_menu_waste(
         created_by=current_user.id
     )
     db.add(waste_record)
+    record_daily_summary(db, cafe_id, waste_day, waste_cost=total_cost)
+    bump_resource_versions(db, cafe_id, Resource.stock)
     db.commit()
     db.refresh(waste_record)
     
@@ -1,11 +1,115 @@
+import threading
+import time
+from uuid import uuid4
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+def async_database_url(database_url: str) -> URL:
+    """DATABASE_URL rewritten for the asyncpg driver"""
+    url = make_url(database_url)
+    query = dict(url.query)
+    # asyncpg takes "ssl" instead of libpq's "sslmode"
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return url.set(drivername="postgresql+asyncpg", query=query)
+
+class _MeteredPoolMixin:
+    """Records how long callers wait for a connection (pre-ping included)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            with self._metrics_lock:
+                self.checkout_timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._metrics_lock:
+                self.checkouts += 1
+                self.total_wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def recreate(self):
+        # Keep counters across pool recreation (e.g. after a disconnect)
+        new_pool = super().recreate()
+        new_pool.checkouts = self.checkouts
+        new_pool.checkout_timeouts = self.checkout_timeouts
+        new_pool.total_wait_seconds = self.total_wait_seconds
+        new_pool.max_wait_seconds = self.max_wait_seconds
+        return new_pool
+
+class MeteredQueuePool(_MeteredPoolMixin, QueuePool):
+    pass
+
+class MeteredAsyncAdaptedQueuePool(_MeteredPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def _pool_options() -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+def _async_connect_args() -> dict:
+    if not settings.DB_PGBOUNCER_MODE:
+        return {}
+    # Transaction poolers (pgbouncer, Supabase port 6543) hand each transaction to
+    # any server connection, so named prepared statements must not be reused
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+# Sync engine: scripts, migrations and endpoints not yet moved to the async path
+engine = create_engine(settings.DATABASE_URL, poolclass=MeteredQueuePool, **_pool_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine (asyncpg) used by the API so queries don't block the event loop
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    poolclass=MeteredAsyncAdaptedQueuePool,
+    connect_args=_async_connect_args(),
+    **_pool_options()
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def pool_metrics() -> dict:
+    """Current state and checkout wait statistics of both connection pools"""
+    metrics = {}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        metrics[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "checkouts": pool.checkouts,
+            "checkout_timeouts": pool.checkout_timeouts,
+            "avg_wait_ms": round(pool.total_wait_seconds / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+            "max_wait_ms": round(pool.max_wait_seconds * 1000, 3),
+        }
+    return metrics
+
 Base = declarative_base()
 
 def get_db():
@@ -15,3 +119,14 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """
+    Dependency for getting an async database session.
+
+    ORM code written against a sync Session (the services, most endpoint bodies)
+    runs on it through `await db.run_sync(fn, ...)`: its queries then go through
+    asyncpg and yield to the event loop instead of blocking it.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,15 +1,82 @@
-from typing import Optional
+import time
+from typing import Callable, Optional, Union
 from uuid import UUID
 from fastapi import Depends, HTTPException, status, Header
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_async_db, get_db
 from app.core.security import decode_access_token
 from app.models.user import User
 from app.models.cafe import UserCafeRole
 
+# Auth lookups repeated on every request. Entries live at most
+# AUTH_CACHE_TTL_SECONDS, so other processes' writes show up within that delay.
+token_cache = TTLCache(settings.AUTH_CACHE_MAX_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+user_cache = TTLCache(settings.AUTH_CACHE_MAX_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+membership_cache = TTLCache(settings.AUTH_CACHE_MAX_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+
+def invalidate_cafe_access(user_id: Optional[UUID] = None, cafe_id: Optional[UUID] = None) -> None:
+    """Forget cached cafe roles of a user, of a cafe, or of one (user, cafe) pair"""
+    membership_cache.delete_where(
+        lambda key: (user_id is None or key[0] == user_id) and (cafe_id is None or key[1] == cafe_id)
+    )
+
+async def run_db(db: Union[Session, AsyncSession], fn: Callable, *args):
+    """Call fn(sync_session, *args) on either kind of session"""
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return fn(db, *args)
+
+def _decode_token(token: str) -> Optional[dict]:
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = decode_access_token(token)
+        if payload is None:
+            return None
+        # Never keep a token cached past its own expiry
+        expires_in = payload.get("exp", 0) - time.time()
+        token_cache.set(token, payload, ttl_seconds=expires_in)
+    return payload
+
+def _fetch_user(db: Session, user_id: UUID) -> Optional[dict]:
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        return None
+    return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+
+def _attach_user(db: Session, values: dict) -> User:
+    # Rebuild a detached copy and attach it to this session without a SELECT
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+async def _load_user(db: Union[Session, AsyncSession], user_id: UUID) -> Optional[User]:
+    values = user_cache.get(user_id)
+    if values is None:
+        # Looked up on a short session of its own, closed straight away: the
+        # request's session never checks out a connection just to authenticate,
+        # so endpoints on the sync get_db session don't hold a second one idle
+        async with AsyncSessionLocal() as lookup:
+            values = await lookup.run_sync(_fetch_user, user_id)
+        if values is None:
+            return None
+        user_cache.set(user_id, values)
+    
+    return await run_db(db, _attach_user, values)
+
+def _load_role(db: Session, user_id: UUID, cafe_id: UUID) -> Optional[str]:
+    user_role = db.query(UserCafeRole).filter(
+        UserCafeRole.user_id == user_id,
+        UserCafeRole.cafe_id == cafe_id
+    ).first()
+    return user_role.role if user_role else None
+
 async def get_current_user(
     authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Get the current authenticated user from JWT token"""
     credentials_exception = HTTPException(
@@ -28,7 +95,7 @@ async def get_current_user(
     except ValueError:
         raise credentials_exception
     
-    payload = decode_access_token(token)
+    payload = _decode_token(token)
     if payload is None:
         raise credentials_exception
     
@@ -36,7 +103,10 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == UUID(user_id)).first()
+    try:
+        user = await _load_user(db, UUID(user_id))
+    except ValueError:
+        raise credentials_exception
     if user is None:
         raise credentials_exception
     
@@ -45,24 +115,25 @@ async def get_current_user(
 async def verify_cafe_access(
     cafe_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Union[Session, AsyncSession] = Depends(get_db),
     required_role: Optional[str] = None
 ) -> bool:
     """Verify that the current user has access to the specified cafe"""
-    user_role = db.query(UserCafeRole).filter(
-        UserCafeRole.user_id == current_user.id,
-        UserCafeRole.cafe_id == cafe_id
-    ).first()
-    
-    if not user_role:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have access to this cafe"
-        )
+    role = membership_cache.get((current_user.id, cafe_id))
+    if role is None:
+        role = await run_db(db, _load_role, current_user.id, cafe_id)
+        
+        if role is None:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You don't have access to this cafe"
+            )
+        
+        membership_cache.set((current_user.id, cafe_id), role)
     
     if required_role:
         role_hierarchy = {"owner": 3, "manager": 2, "server": 1}
-        if role_hierarchy.get(user_role.role, 0) < role_hierarchy.get(required_role, 0):
+        if role_hierarchy.get(role, 0) < role_hierarchy.get(required_role, 0):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"You need {required_role} role to perform this action"
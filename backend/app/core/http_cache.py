@@ -0,0 +1,21 @@
+from fastapi import HTTPException, Request, Response, status
+
+# Clients may keep listings but must revalidate them, which costs a 304 when unchanged
+LISTING_CACHE_CONTROL = "private, no-cache"
+
+
+def check_etag(request: Request, response: Response, etag: str) -> None:
+    """
+    Answer 304 Not Modified when If-None-Match already names etag; otherwise tag
+    the response so the client can revalidate it next time.
+    """
+    headers = {"ETag": etag, "Cache-Control": LISTING_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # If-None-Match uses weak comparison
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
@@ -0,0 +1,115 @@
+import os
+import re
+import stat
+import threading
+from mimetypes import guess_type
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+
+# Basenames that embed a content hash (as written by the upload endpoint) never change
+CONTENT_HASHED_NAME = re.compile(r"^[0-9a-f]{32,64}\.[A-Za-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Anything else may be replaced or deleted under the same name, so revalidate it
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+# Pre-generated siblings tried in order of preference: file.br, then file.gz
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "requests": 0,
+    "not_modified": 0,
+    "bytes_served": 0,
+    "precompressed": {encoding: {"requests": 0, "bytes_served": 0} for encoding, _ in PRECOMPRESSED_ENCODINGS},
+}
+
+
+def _compressible(media_type: str) -> bool:
+    # Images, video and archives are already compressed
+    return media_type.startswith("text/") or media_type in (
+        "application/json", "application/javascript", "application/xml", "image/svg+xml"
+    )
+
+
+def _accepted_encodings(request_headers: Headers) -> set:
+    accepted = set()
+    for part in request_headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class UploadStaticFiles(StaticFiles):
+    """
+    StaticFiles for UPLOAD_DIR.
+
+    Content-hashed files get a one-year immutable Cache-Control, others must be
+    revalidated (ETag / Last-Modified, answered with 304). Text-like files are
+    served from a pre-generated .br or .gz sibling when present and accepted,
+    with Vary: Accept-Encoding. Requests and bytes served are counted for
+    static_file_metrics.
+    """
+
+    async def get_response(self, path: str, scope) -> Response:
+        # Storage internals (the local backend's object store) are not published
+        if path.split("/", 1)[0].split(os.sep, 1)[0] == ".objects":
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = guess_type(str(full_path))[0] or "text/plain"
+        name = os.path.basename(str(full_path))
+
+        headers = {
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if CONTENT_HASHED_NAME.match(name) else REVALIDATE_CACHE_CONTROL
+        }
+
+        served_path, served_stat, encoding = full_path, stat_result, None
+        if _compressible(media_type):
+            headers["Vary"] = "Accept-Encoding"
+            accepted = _accepted_encodings(request_headers)
+            for candidate_encoding, suffix in PRECOMPRESSED_ENCODINGS:
+                if candidate_encoding not in accepted:
+                    continue
+                try:
+                    candidate_stat = os.stat(f"{full_path}{suffix}")
+                except OSError:
+                    continue
+                if stat.S_ISREG(candidate_stat.st_mode):
+                    served_path, served_stat, encoding = f"{full_path}{suffix}", candidate_stat, candidate_encoding
+                    headers["Content-Encoding"] = encoding
+                    break
+
+        # The ETag comes from the file actually sent, so each encoding has its own
+        response = FileResponse(
+            served_path, status_code=status_code, stat_result=served_stat, media_type=media_type, headers=headers
+        )
+
+        not_modified = self.is_not_modified(response.headers, request_headers)
+        sent = 0 if not_modified or scope["method"] == "HEAD" else served_stat.st_size
+        with _metrics_lock:
+            _metrics["requests"] += 1
+            _metrics["not_modified"] += not_modified
+            _metrics["bytes_served"] += sent
+            if encoding is not None:
+                _metrics["precompressed"][encoding]["requests"] += 1
+                _metrics["precompressed"][encoding]["bytes_served"] += sent
+
+        if not_modified:
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def static_file_metrics() -> dict:
+    """Requests, 304s and body bytes served from /uploads by this process"""
+    with _metrics_lock:
+        return {
+            **{key: value for key, value in _metrics.items() if key != "precompressed"},
+            "precompressed": {encoding: dict(counts) for encoding, counts in _metrics["precompressed"].items()},
+        }
@@ -0,0 +1,203 @@
+import hashlib
+import os
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional
+from app.core.config import settings
+from app.core.supabase import get_supabase_client
+
+
+class StorageBackend(ABC):
+    """
+    Where uploaded files live. Files are addressed by a relative name such as
+    "<upload id>/<hash>.webp"; put returns the URL the name is served from.
+    Methods block, so call them from a thread rather than the event loop.
+    Invalid names raise ValueError.
+    """
+
+    @abstractmethod
+    def put(self, name: str, data: bytes, content_type: str, cache_seconds: Optional[int] = None) -> str:
+        ...
+
+    @abstractmethod
+    def delete(self, names: Iterable[str]) -> None:
+        ...
+
+    @abstractmethod
+    def url(self, name: str) -> str:
+        ...
+
+    @abstractmethod
+    def name_from_url(self, url: str) -> str:
+        """Name of a stored file from its URL (plain names are returned as is)"""
+
+
+class LocalStorage(StorageBackend):
+    """
+    Content-addressed files under a local directory, served by the /uploads mount.
+
+    Each distinct content is written once to .objects/ab/cd/<sha256>; every name
+    is a hard link to its object, so identical images uploaded by different cafes
+    share one copy on disk, and deleting one name leaves the others intact. Files
+    are written to a temporary path and renamed into place, so readers never see
+    a partial file. Falls back to plain copies where hard links are unsupported.
+    """
+
+    OBJECTS_DIR = ".objects"
+
+    def __init__(self, root: str, base_url: str = "/uploads"):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, name: str) -> str:
+        relative = os.path.normpath(name.lstrip("/"))
+        if relative.startswith("..") or relative.split(os.sep)[0] == self.OBJECTS_DIR:
+            raise ValueError(f"Invalid file name: {name}")
+        return os.path.join(self.root, relative)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, self.OBJECTS_DIR, digest[:2], digest[2:4], digest)
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def put(self, name: str, data: bytes, content_type: str, cache_seconds: Optional[int] = None) -> str:
+        path = self._path(name)
+        object_path = self._object_path(hashlib.sha256(data).hexdigest())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # A concurrent delete may drop the object between writing and linking it
+        for _ in range(2):
+            if not os.path.exists(object_path):
+                self._write_atomic(object_path, data)
+            temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            try:
+                os.link(object_path, temp_path)
+            except FileNotFoundError:
+                continue
+            except OSError:
+                self._write_atomic(path, data)
+                break
+            os.replace(temp_path, path)
+            break
+        else:
+            self._write_atomic(path, data)
+
+        return self.url(name)
+
+    def delete(self, names: Iterable[str]) -> None:
+        # Check every name before removing any, so a bad one deletes nothing
+        names = list(names)
+        paths = [self._path(name) for name in names]
+        for name, path in zip(names, paths):
+            if os.path.lexists(path) and not os.path.isfile(path):
+                raise ValueError(f"Not a file: {name}")
+
+        for path in paths:
+            try:
+                with open(path, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+
+            directory = os.path.dirname(path)
+            if directory != self.root:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass  # Other files of the upload remain
+
+            # Drop the object once no name links to it any more
+            object_path = self._object_path(digest)
+            try:
+                if os.stat(object_path).st_nlink == 1:
+                    os.remove(object_path)
+            except FileNotFoundError:
+                pass
+
+    def url(self, name: str) -> str:
+        return f"{self.base_url}/{name.lstrip('/')}"
+
+    def name_from_url(self, url: str) -> str:
+        if url.startswith("http"):
+            url = "/" + url.split("/", 3)[-1]
+        if url.startswith(self.base_url + "/"):
+            return url[len(self.base_url) + 1:]
+        return url.lstrip("/")
+
+
+class SupabaseStorage(StorageBackend):
+    """Files in a Supabase Storage bucket, through the shared Supabase client"""
+
+    def __init__(self, bucket_name: str):
+        self.bucket_name = bucket_name
+
+    @property
+    def bucket(self):
+        supabase = get_supabase_client()
+        if supabase is None:
+            raise RuntimeError("Supabase storage is not configured")
+        return supabase.storage.from_(self.bucket_name)
+
+    def put(self, name: str, data: bytes, content_type: str, cache_seconds: Optional[int] = None) -> str:
+        file_options = {"content-type": content_type, "upsert": "true"}
+        if cache_seconds is not None:
+            file_options["cache-control"] = str(cache_seconds)
+        bucket = self.bucket
+        bucket.upload(path=name, file=data, file_options=file_options)
+        return bucket.get_public_url(name)
+
+    def delete(self, names: Iterable[str]) -> None:
+        names = list(names)
+        if names:
+            self.bucket.remove(names)
+
+    def url(self, name: str) -> str:
+        return self.bucket.get_public_url(name)
+
+    def name_from_url(self, url: str) -> str:
+        marker = f"/object/public/{self.bucket_name}/"
+        if marker in url:
+            return url.split(marker, 1)[1].split("?", 1)[0]
+        return url.split("/")[-1] if url.startswith("http") else url
+
+
+_storage: Optional[StorageBackend] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> StorageBackend:
+    """
+    The configured storage backend (STORAGE_BACKEND): "local" stores in
+    UPLOAD_DIR, "supabase" in the SUPABASE_STORAGE_BUCKET bucket, and "auto"
+    uses Supabase when SUPABASE_URL and SUPABASE_KEY are set.
+    """
+    global _storage
+
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                backend = settings.STORAGE_BACKEND
+                if backend == "auto":
+                    backend = "supabase" if settings.SUPABASE_URL and settings.SUPABASE_KEY else "local"
+
+                if backend == "local":
+                    _storage = LocalStorage(settings.UPLOAD_DIR)
+                elif backend == "supabase":
+                    _storage = SupabaseStorage(settings.SUPABASE_STORAGE_BUCKET)
+                else:
+                    raise ValueError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+
+    return _storage
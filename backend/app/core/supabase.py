@@ -1,8 +1,11 @@
+import threading
 from typing import Optional
-from supabase import create_client, Client
+import httpx
+from supabase import create_client, Client, ClientOptions
 from app.core.config import settings
 
 _supabase_client: Optional[Client] = None
+_supabase_lock = threading.Lock()
 
 def get_supabase_client() -> Optional[Client]:
     """
@@ -14,6 +17,10 @@ def get_supabase_client() -> Optional[Client]:
     - File storage (menu item images)
     - Realtime subscriptions
     - Built-in auth (alternative to our JWT)
+    
+    The client is created once per process and shares one keep-alive HTTP
+    connection pool, so calls after the first skip the TLS handshake. Its
+    methods block; call them from a thread rather than the event loop.
     """
     global _supabase_client
     
@@ -22,10 +29,32 @@ def get_supabase_client() -> Optional[Client]:
         supabase_key = getattr(settings, 'SUPABASE_KEY', None)
         
         if supabase_url and supabase_key:
-            _supabase_client = create_client(supabase_url, supabase_key)
+            with _supabase_lock:
+                if _supabase_client is None:
+                    http_client = httpx.Client(
+                        timeout=settings.SUPABASE_HTTP_TIMEOUT_SECONDS,
+                        limits=httpx.Limits(
+                            max_connections=settings.SUPABASE_HTTP_MAX_CONNECTIONS,
+                            max_keepalive_connections=settings.SUPABASE_HTTP_MAX_CONNECTIONS
+                        ),
+                        follow_redirects=True,
+                        http2=True
+                    )
+                    _supabase_client = create_client(
+                        supabase_url, supabase_key, options=ClientOptions(httpx_client=http_client)
+                    )
     
     return _supabase_client
 
+def close_supabase_client() -> None:
+    """Close the shared client's connection pool (on shutdown)"""
+    global _supabase_client
+    
+    with _supabase_lock:
+        if _supabase_client is not None:
+            _supabase_client.options.httpx_client.close()
+            _supabase_client = None
+
 # Example usage in endpoints:
 # 
 # from app.core.supabase import get_supabase_client
@@ -1,8 +1,10 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1 import api_router
 from app.core.config import settings
+from app.core.static_files import UploadStaticFiles
+from app.core.supabase import close_supabase_client
+from app.services.images import shutdown_image_executor
 import os
 
 app = FastAPI(
@@ -17,8 +19,8 @@ app = FastAPI(
 if not os.path.exists(settings.UPLOAD_DIR):
     os.makedirs(settings.UPLOAD_DIR)
 
-# Mount static files
-app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+# Mount uploaded files with long-lived caching for content-hashed names
+app.mount("/uploads", UploadStaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 
 # CORS middleware
 app.add_middleware(
@@ -32,6 +34,14 @@ app.add_middleware(
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.on_event("shutdown")
+def shutdown_storage_client():
+    close_supabase_client()
+
+@app.on_event("shutdown")
+def shutdown_image_workers():
+    shutdown_image_executor()
+
 @app.get("/")
 async def root():
     return {
@@ -1,26 +1,31 @@
 # Import all models here for easy access
 from app.models.user import User
-from app.models.cafe import Cafe, UserCafeRole
+from app.models.cafe import Cafe, UserCafeRole, CafeResourceVersion
 from app.models.category import MenuCategory
 from app.models.staff import Staff, StaffSalaryHistory
-from app.models.stock import StockItem, StockCostHistory
-from app.models.menu import MenuItem, MenuPriceHistory, MenuItemRecipe
+from app.models.stock import StockItem, StockCostHistory, StockTransaction, StockSnapshot
+from app.models.menu import MenuItem, MenuPriceHistory, MenuItemRecipe, MenuItemCost
 from app.models.order import Order, OrderItem
 from app.models.expense import MonthlyExpense, DailyExpense
 from app.models.supplier import Supplier, PurchaseOrder, PurchaseOrderItem
+from app.models.summary import DailyCafeSummary
 
 __all__ = [
     "User",
     "Cafe",
     "UserCafeRole",
+    "CafeResourceVersion",
     "MenuCategory",
     "Staff",
     "StaffSalaryHistory",
     "StockItem",
     "StockCostHistory",
+    "StockTransaction",
+    "StockSnapshot",
     "MenuItem",
     "MenuPriceHistory",
     "MenuItemRecipe",
+    "MenuItemCost",
     "Order",
     "OrderItem",
     "MonthlyExpense",
@@ -28,4 +33,5 @@ __all__ = [
     "Supplier",
     "PurchaseOrder",
     "PurchaseOrderItem",
+    "DailyCafeSummary",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, ForeignKey, TIMESTAMP, text
+from sqlalchemy import Column, String, ForeignKey, TIMESTAMP, text, BigInteger
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -38,3 +38,11 @@ class UserCafeRole(Base):
     # Relationships
     user = relationship("User", back_populates="cafe_roles")
     cafe = relationship("Cafe", back_populates="user_roles")
+
+class CafeResourceVersion(Base):
+    __tablename__ = "cafe_resource_versions"
+    
+    cafe_id = Column(UUID(as_uuid=True), ForeignKey('cafes.id', ondelete='CASCADE'), primary_key=True)
+    resource = Column(String, primary_key=True)  # 'menu', 'categories', 'stock', 'staff'
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=text('NOW()'))
@@ -1,5 +1,5 @@
 from sqlalchemy import Column, String, ForeignKey, TIMESTAMP, text, Numeric, Date
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 import uuid
@@ -12,6 +12,7 @@ class MenuItem(Base):
     category_id = Column(UUID(as_uuid=True), ForeignKey('menu_categories.id', ondelete='SET NULL'), nullable=True)
     name = Column(String, nullable=False)
     image_url = Column(String)
+    image_variants = Column(JSONB)  # {variant: {width, height, webp, avif}} from the upload endpoint
     created_at = Column(TIMESTAMP(timezone=True), server_default=text('NOW()'))
     updated_at = Column(TIMESTAMP(timezone=True), server_default=text('NOW()'))
     
@@ -62,3 +63,18 @@ class MenuWaste(Base):
     # Relationships
     menu_item = relationship("MenuItem")
     user = relationship("User")
+
+class MenuItemCost(Base):
+    __tablename__ = "menu_item_cost"
+    
+    # Current recipe cost and margin, maintained by app/services/menu_costs.py
+    menu_item_id = Column(UUID(as_uuid=True), ForeignKey('menu_items.id', ondelete='CASCADE'), primary_key=True)
+    cafe_id = Column(UUID(as_uuid=True), ForeignKey('cafes.id', ondelete='CASCADE'), nullable=False)
+    sale_price = Column(Numeric(10, 3))
+    unit_cost = Column(Numeric(14, 6), nullable=False, default=0)
+    margin = Column(Numeric(14, 6))
+    margin_percent = Column(Numeric(7, 2))
+    cost_effective_date = Column(Date)  # Latest start_date among the ingredient costs used
+    valid_from = Column(Date, nullable=False)
+    valid_until = Column(Date)  # Next scheduled price or cost change (exclusive), if any
+    refreshed_at = Column(TIMESTAMP(timezone=True), server_default=text('NOW()'))
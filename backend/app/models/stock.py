@@ -2,8 +2,16 @@ from sqlalchemy import Column, String, ForeignKey, TIMESTAMP, text, Numeric, Dat
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.core.database import Base
+import enum
 import uuid
 
+class StockTransactionType(str, enum.Enum):
+    restock = "restock"
+    waste = "waste"
+    initial = "initial"
+    usage = "usage"
+    usage_reversal = "usage_reversal"
+
 class StockItem(Base):
     __tablename__ = "stock_items"
     
@@ -40,11 +48,20 @@ class StockTransaction(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     stock_item_id = Column(UUID(as_uuid=True), ForeignKey('stock_items.id', ondelete='CASCADE'), nullable=False)
     quantity_change = Column(Numeric(10, 3), nullable=False)
-    transaction_type = Column(String, nullable=False) # 'restock', 'usage', 'adjustment', 'initial'
+    transaction_type = Column(String, nullable=False) # StockTransactionType value
     notes = Column(String, nullable=True)
     created_at = Column(TIMESTAMP(timezone=True), server_default=text('NOW()'))
     created_by = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=True)
+    order_id = Column(UUID(as_uuid=True), nullable=True)  # usage / usage_reversal rows; no FK, outlives the order
 
     # Relationships
     stock_item = relationship("StockItem", back_populates="transactions")
     user = relationship("User")
+
+class StockSnapshot(Base):
+    __tablename__ = "stock_snapshots"
+
+    # Ledger balance of the item including every transaction up to snapshot_at
+    stock_item_id = Column(UUID(as_uuid=True), ForeignKey('stock_items.id', ondelete='CASCADE'), primary_key=True)
+    snapshot_at = Column(TIMESTAMP(timezone=True), primary_key=True)
+    quantity = Column(Numeric(12, 3), nullable=False)
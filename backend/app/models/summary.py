@@ -0,0 +1,15 @@
+from sqlalchemy import Column, ForeignKey, TIMESTAMP, text, Numeric, Integer, Date
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+
+class DailyCafeSummary(Base):
+    __tablename__ = "daily_cafe_summary"
+    
+    cafe_id = Column(UUID(as_uuid=True), ForeignKey('cafes.id', ondelete='CASCADE'), primary_key=True)
+    date = Column(Date, primary_key=True)
+    revenue = Column(Numeric(12, 3), nullable=False, default=0)
+    cogs = Column(Numeric(12, 3), nullable=False, default=0)
+    order_count = Column(Integer, nullable=False, default=0)
+    waste_cost = Column(Numeric(12, 3), nullable=False, default=0)
+    daily_expenses = Column(Numeric(12, 3), nullable=False, default=0)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=text('NOW()'))
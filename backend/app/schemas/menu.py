@@ -1,14 +1,21 @@
-from typing import Optional, List
+from typing import Dict, Optional, List
 from uuid import UUID
 from datetime import datetime, date
 from decimal import Decimal
 from pydantic import BaseModel
 
 # Menu Item Schemas
+class ImageVariant(BaseModel):
+    width: int
+    height: int
+    webp: str
+    avif: Optional[str] = None
+
 class MenuItemBase(BaseModel):
     name: str
     category_id: Optional[UUID] = None
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, ImageVariant]] = None  # As returned by the upload endpoint
 
 class MenuItemCreate(MenuItemBase):
     sale_price: Decimal
@@ -17,13 +24,19 @@ class MenuItemUpdate(BaseModel):
     name: Optional[str] = None
     category_id: Optional[UUID] = None
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, ImageVariant]] = None  # Replaced together with image_url
 
 class MenuItemResponse(MenuItemBase):
     id: UUID
     cafe_id: UUID
     category_id: Optional[UUID] = None
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, ImageVariant]] = None
     sale_price: Optional[Decimal] = None
+    current_cost: Optional[Decimal] = None  # Only with include_costs
+    margin: Optional[Decimal] = None  # sale_price - current_cost
+    margin_percent: Optional[Decimal] = None  # margin as a percentage of sale_price
+    cost_effective_date: Optional[date] = None  # Latest start_date among the ingredient costs used
     created_at: datetime
     
     class Config:
@@ -62,3 +75,26 @@ class MenuItemRecipeResponse(BaseModel):
 class MenuItemRecipeDetail(MenuItemRecipeResponse):
     stock_item_name: str
     unit_of_measure: str
+
+# Menu Engineering
+class MenuEngineeringItem(BaseModel):
+    menu_item_id: UUID
+    name: str
+    category_id: Optional[UUID] = None
+    sale_price: Optional[Decimal] = None
+    unit_cost: Decimal
+    margin: Optional[Decimal] = None
+    margin_percent: Optional[Decimal] = None
+    cost_effective_date: Optional[date] = None
+    units_sold: int
+    revenue: Decimal  # At the prices the period's orders were sold at
+    gross_profit: Decimal  # Revenue minus cost at sale
+    menu_mix_percent: Decimal  # Share of all units sold in the period
+    classification: str  # star, plowhorse, puzzle or dog
+
+class MenuEngineeringResponse(BaseModel):
+    start_date: date
+    end_date: date
+    average_margin: Decimal  # Sales-weighted; items at or above it count as profitable
+    popularity_threshold_percent: Decimal  # Menu mix at or above it counts as popular
+    items: List[MenuEngineeringItem]
@@ -1,8 +1,11 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 from decimal import Decimal
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+# Largest number of orders accepted by one bulk import
+MAX_BULK_ORDERS = 2000
 
 # Order Item Input
 class OrderItemInput(BaseModel):
@@ -40,3 +43,24 @@ class OrderResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+# Order History Page
+class OrderPage(BaseModel):
+    items: List[OrderResponse]
+    next_cursor: Optional[str] = None  # None on the last page
+
+# Bulk Order Import
+class BulkOrderCreate(BaseModel):
+    orders: List[OrderCreate] = Field(..., max_length=MAX_BULK_ORDERS)
+
+class BulkOrderRowError(BaseModel):
+    row: int  # Index in orders, or line number for CSV uploads
+    detail: str
+
+class BulkOrderResult(BaseModel):
+    created: int
+    order_ids: List[UUID]
+    total_revenue: Decimal
+    total_cost: Decimal
+    errors: List[BulkOrderRowError]
+    dry_run: bool
@@ -25,6 +25,10 @@ class StockItemResponse(StockItemBase):
     current_quantity: Decimal
     cost_per_unit: Decimal  # Current cost
     created_at: datetime
+    stock_value: Optional[Decimal] = None  # current_quantity * cost_per_unit
+    is_low_stock: Optional[bool] = None
+    avg_daily_usage: Optional[Decimal] = None  # From sales over the usage window
+    days_of_cover: Optional[Decimal] = None  # None when there is no recent usage
     
     class Config:
         from_attributes = True
@@ -63,9 +67,22 @@ class StockTransactionResponse(BaseModel):
     notes: Optional[str] = None
     created_at: datetime
     created_by: Optional[UUID] = None
+    order_id: Optional[UUID] = None  # Order of sale usage and its reversal
 
     class Config:
         from_attributes = True
 
 class StockTransactionWithItemResponse(StockTransactionResponse):
     stock_item_name: str
+
+class StockTransactionPage(BaseModel):
+    items: List[StockTransactionWithItemResponse]
+    next_cursor: Optional[str] = None  # None on the last page
+
+class StockLevelResponse(BaseModel):
+    stock_item_id: UUID
+    name: str
+    unit_of_measure: str
+    quantity: Decimal  # Reconstructed from the ledger at the requested time
+    current_quantity: Decimal
+    ledger_drift: Decimal  # current_quantity minus the full ledger balance; 0 when fully recorded
@@ -0,0 +1,173 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Dict, Optional
+from uuid import UUID
+from zoneinfo import ZoneInfo
+from sqlalchemy import func, cast, Date
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.order import Order, OrderItem
+from app.models.menu import MenuWaste
+from app.models.expense import DailyExpense
+from app.models.summary import DailyCafeSummary
+from app.core.config import settings
+
+SUMMARY_FIELDS = ("revenue", "cogs", "order_count", "waste_cost", "daily_expenses")
+
+BUSINESS_TIMEZONE = ZoneInfo(settings.BUSINESS_TIMEZONE)
+
+
+def business_timestamp(timestamp: Optional[datetime] = None) -> datetime:
+    """
+    An aware timestamp to store: now when none is given, and naive client
+    timestamps read as BUSINESS_TIMEZONE rather than the server's or database's zone.
+    """
+    if timestamp is None:
+        return datetime.now(timezone.utc)
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=BUSINESS_TIMEZONE)
+    return timestamp
+
+
+def business_day(timestamp: Optional[datetime] = None) -> date:
+    """
+    The BUSINESS_TIMEZONE day a timestamp (default now) counts on in the daily
+    summary. business_day_column is the SQL equivalent used by the rebuild, so
+    writes and rebuilds always agree whatever the server or session time zone.
+    """
+    return business_timestamp(timestamp).astimezone(BUSINESS_TIMEZONE).date()
+
+
+def business_day_start(day: date) -> datetime:
+    """Aware midnight starting a BUSINESS_TIMEZONE day, for index-friendly timestamp bounds"""
+    return datetime.combine(day, datetime.min.time(), tzinfo=BUSINESS_TIMEZONE)
+
+
+def business_day_column(column):
+    """SQL expression for business_day of a timestamptz column"""
+    return cast(func.timezone(settings.BUSINESS_TIMEZONE, column), Date)
+
+
+def record_daily_summary(
+    db: Session,
+    cafe_id: UUID,
+    day: date,
+    revenue: Decimal = Decimal("0"),
+    cogs: Decimal = Decimal("0"),
+    order_count: int = 0,
+    waste_cost: Decimal = Decimal("0"),
+    daily_expenses: Decimal = Decimal("0")
+) -> None:
+    """
+    Add signed deltas to a cafe's summary row for a day, creating it if needed.
+
+    Runs as a single INSERT ... ON CONFLICT DO UPDATE in the caller's transaction,
+    so the rollup commits or rolls back together with the write that caused it.
+    """
+    table = DailyCafeSummary.__table__
+    stmt = insert(table).values(
+        cafe_id=cafe_id,
+        date=day,
+        revenue=revenue,
+        cogs=cogs,
+        order_count=order_count,
+        waste_cost=waste_cost,
+        daily_expenses=daily_expenses
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.cafe_id, table.c.date],
+        set_={
+            **{field: table.c[field] + stmt.excluded[field] for field in SUMMARY_FIELDS},
+            "updated_at": func.now()
+        }
+    )
+    db.execute(stmt)
+
+
+def get_daily_summaries(db: Session, cafe_id: UUID, start: date, end: date) -> Dict[date, DailyCafeSummary]:
+    """Summary rows of a cafe for the inclusive range [start, end], keyed by date"""
+    rows = db.query(DailyCafeSummary).filter(
+        DailyCafeSummary.cafe_id == cafe_id,
+        DailyCafeSummary.date >= start,
+        DailyCafeSummary.date <= end
+    ).all()
+
+    return {row.date: row for row in rows}
+
+
+def rebuild_daily_summary(
+    db: Session,
+    cafe_id: Optional[UUID] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None
+) -> int:
+    """
+    Recompute summary rows from orders, menu waste and daily expenses.
+
+    Used to backfill the table and to repair drift. Optionally limited to one
+    cafe and/or an inclusive date range. Returns the number of rows written.
+    """
+    totals: Dict[tuple, Dict[str, object]] = {}
+
+    def bucket(row_cafe_id, row_day):
+        key = (row_cafe_id, row_day)
+        if key not in totals:
+            totals[key] = {field: 0 for field in SUMMARY_FIELDS}
+        return totals[key]
+
+    # Sales
+    order_day = business_day_column(Order.timestamp)
+    line_totals = db.query(
+        OrderItem.order_id,
+        func.sum(OrderItem.price_at_sale * OrderItem.quantity).label("revenue"),
+        func.sum(OrderItem.cost_at_sale * OrderItem.quantity).label("cogs")
+    ).group_by(OrderItem.order_id).subquery()
+
+    sales = db.query(
+        Order.cafe_id,
+        order_day,
+        func.coalesce(func.sum(line_totals.c.revenue), 0),
+        func.coalesce(func.sum(line_totals.c.cogs), 0),
+        func.count(Order.id)
+    ).outerjoin(line_totals, line_totals.c.order_id == Order.id)
+    sales = _filter_range(sales, Order.cafe_id, order_day, cafe_id, start, end)
+    for row_cafe_id, row_day, revenue, cogs, order_count in sales.group_by(Order.cafe_id, order_day):
+        row = bucket(row_cafe_id, row_day)
+        row.update(revenue=revenue, cogs=cogs, order_count=order_count)
+
+    # Menu waste
+    waste_day = business_day_column(MenuWaste.created_at)
+    waste = db.query(MenuWaste.cafe_id, waste_day, func.sum(MenuWaste.total_cost))
+    waste = _filter_range(waste, MenuWaste.cafe_id, waste_day, cafe_id, start, end)
+    for row_cafe_id, row_day, waste_cost in waste.group_by(MenuWaste.cafe_id, waste_day):
+        bucket(row_cafe_id, row_day)["waste_cost"] = waste_cost
+
+    # Daily expenses
+    expenses = db.query(DailyExpense.cafe_id, DailyExpense.date, func.sum(DailyExpense.amount))
+    expenses = _filter_range(expenses, DailyExpense.cafe_id, DailyExpense.date, cafe_id, start, end)
+    for row_cafe_id, row_day, amount in expenses.group_by(DailyExpense.cafe_id, DailyExpense.date):
+        bucket(row_cafe_id, row_day)["daily_expenses"] = amount
+
+    # Replace the affected range
+    existing = _filter_range(
+        db.query(DailyCafeSummary), DailyCafeSummary.cafe_id, DailyCafeSummary.date, cafe_id, start, end
+    )
+    existing.delete(synchronize_session=False)
+
+    if totals:
+        db.execute(insert(DailyCafeSummary.__table__), [
+            {"cafe_id": row_cafe_id, "date": row_day, **values}
+            for (row_cafe_id, row_day), values in totals.items()
+        ])
+
+    return len(totals)
+
+
+def _filter_range(query, cafe_column, day_column, cafe_id, start, end):
+    if cafe_id is not None:
+        query = query.filter(cafe_column == cafe_id)
+    if start is not None:
+        query = query.filter(day_column >= start)
+    if end is not None:
+        query = query.filter(day_column <= end)
+    return query
@@ -0,0 +1,306 @@
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import AsyncIterator, Callable, Dict, List, Tuple
+from uuid import UUID
+from sqlalchemy import func, select
+from sqlalchemy.sql import Select
+from app.core.database import async_engine
+from app.models.expense import DailyExpense, MonthlyExpense
+from app.models.menu import MenuItem
+from app.models.order import Order, OrderItem
+from app.models.staff import Staff
+from app.models.stock import StockTransaction
+from app.services.daily_summary import business_day_start
+from app.services.stock_ledger import LEDGER_COLUMNS, ledger_query
+
+# Rows fetched from the server-side cursor per round trip
+EXPORT_BATCH_SIZE = 2000
+
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+    parquet = "parquet"
+
+
+class ExportDatasetName(str, Enum):
+    orders = "orders"
+    order_items = "order_items"
+    stock_transactions = "stock_transactions"
+    daily_expenses = "daily_expenses"
+    monthly_expenses = "monthly_expenses"
+
+
+@dataclass
+class ExportDataset:
+    # (column name, kind) where kind is uuid, text, decimal, int, date or timestamp
+    columns: List[Tuple[str, str]]
+    query: Callable[[UUID, date, date], Select]
+
+
+def _day_range(column, start: date, end: date):
+    # Business days, so an exported day holds the same orders as that day's reports
+    return (
+        column >= business_day_start(start),
+        column < business_day_start(end + timedelta(days=1))
+    )
+
+
+def _orders_query(cafe_id: UUID, start: date, end: date) -> Select:
+    return select(
+        Order.id, Order.timestamp, Order.staff_id, Staff.name,
+        func.count(OrderItem.id),
+        func.coalesce(func.sum(OrderItem.price_at_sale * OrderItem.quantity), 0),
+        func.coalesce(func.sum(OrderItem.cost_at_sale * OrderItem.quantity), 0)
+    ).join(Staff, Staff.id == Order.staff_id).outerjoin(
+        OrderItem, OrderItem.order_id == Order.id
+    ).where(
+        Order.cafe_id == cafe_id, *_day_range(Order.timestamp, start, end)
+    ).group_by(Order.id, Staff.name).order_by(Order.timestamp, Order.id)
+
+
+def _order_items_query(cafe_id: UUID, start: date, end: date) -> Select:
+    return select(
+        OrderItem.id, OrderItem.order_id, Order.timestamp, OrderItem.menu_item_id, MenuItem.name,
+        OrderItem.quantity, OrderItem.price_at_sale, OrderItem.cost_at_sale
+    ).join(Order, Order.id == OrderItem.order_id).join(
+        MenuItem, MenuItem.id == OrderItem.menu_item_id
+    ).where(
+        Order.cafe_id == cafe_id, *_day_range(Order.timestamp, start, end)
+    ).order_by(Order.timestamp, OrderItem.order_id, OrderItem.id)
+
+
+def _stock_transactions_query(cafe_id: UUID, start: date, end: date) -> Select:
+    return ledger_query(cafe_id, start_date=start, end_date=end).order_by(
+        StockTransaction.created_at, StockTransaction.id
+    )
+
+
+def _daily_expenses_query(cafe_id: UUID, start: date, end: date) -> Select:
+    return select(
+        DailyExpense.id, DailyExpense.date, DailyExpense.description, DailyExpense.amount, DailyExpense.created_at
+    ).where(
+        DailyExpense.cafe_id == cafe_id, DailyExpense.date >= start, DailyExpense.date <= end
+    ).order_by(DailyExpense.date, DailyExpense.id)
+
+
+def _monthly_expenses_query(cafe_id: UUID, start: date, end: date) -> Select:
+    return select(
+        MonthlyExpense.id, MonthlyExpense.month, MonthlyExpense.description,
+        MonthlyExpense.amount, MonthlyExpense.created_at
+    ).where(
+        MonthlyExpense.cafe_id == cafe_id,
+        MonthlyExpense.month >= start.replace(day=1),
+        MonthlyExpense.month <= end
+    ).order_by(MonthlyExpense.month, MonthlyExpense.id)
+
+
+EXPORT_DATASETS: Dict[ExportDatasetName, ExportDataset] = {
+    ExportDatasetName.orders: ExportDataset(
+        columns=[
+            ("id", "uuid"), ("timestamp", "timestamp"), ("staff_id", "uuid"), ("staff_name", "text"),
+            ("item_count", "int"), ("total_revenue", "decimal"), ("total_cost", "decimal")
+        ],
+        query=_orders_query
+    ),
+    ExportDatasetName.order_items: ExportDataset(
+        columns=[
+            ("id", "uuid"), ("order_id", "uuid"), ("timestamp", "timestamp"), ("menu_item_id", "uuid"),
+            ("menu_item_name", "text"), ("quantity", "int"), ("price_at_sale", "decimal"),
+            ("cost_at_sale", "decimal")
+        ],
+        query=_order_items_query
+    ),
+    ExportDatasetName.stock_transactions: ExportDataset(
+        columns=LEDGER_COLUMNS,
+        query=_stock_transactions_query
+    ),
+    ExportDatasetName.daily_expenses: ExportDataset(
+        columns=[
+            ("id", "uuid"), ("date", "date"), ("description", "text"), ("amount", "decimal"),
+            ("created_at", "timestamp")
+        ],
+        query=_daily_expenses_query
+    ),
+    ExportDatasetName.monthly_expenses: ExportDataset(
+        columns=[
+            ("id", "uuid"), ("month", "date"), ("description", "text"), ("amount", "decimal"),
+            ("created_at", "timestamp")
+        ],
+        query=_monthly_expenses_query
+    ),
+}
+
+
+def _plain(value):
+    """Value as written to CSV/NDJSON: ISO dates, exact decimals as strings"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    return value
+
+
+class _CsvEncoder:
+    media_type = "text/csv"
+
+    def __init__(self, columns: List[Tuple[str, str]]):
+        self.columns = columns
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def _drain(self) -> bytes:
+        data = self.buffer.getvalue().encode("utf-8")
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def header(self) -> bytes:
+        self.writer.writerow([name for name, _ in self.columns])
+        return self._drain()
+
+    def encode(self, rows) -> bytes:
+        self.writer.writerows([_plain(value) for value in row] for row in rows)
+        return self._drain()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _NdjsonEncoder:
+    media_type = "application/x-ndjson"
+
+    def __init__(self, columns: List[Tuple[str, str]]):
+        self.names = [name for name, _ in columns]
+
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows) -> bytes:
+        return "".join(
+            json.dumps(dict(zip(self.names, (_plain(value) for value in row)))) + "\n" for row in rows
+        ).encode("utf-8")
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class _ParquetEncoder:
+    media_type = "application/vnd.apache.parquet"
+
+    def __init__(self, columns: List[Tuple[str, str]]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        arrow_types = {
+            "uuid": pa.string(),
+            "text": pa.string(),
+            "decimal": pa.decimal128(18, 3),
+            "int": pa.int64(),
+            "date": pa.date32(),
+            "timestamp": pa.timestamp("us", tz="UTC"),
+        }
+        self.pa = pa
+        self.kinds = [kind for _, kind in columns]
+        self.schema = pa.schema([(name, arrow_types[kind]) for name, kind in columns])
+        self.sink = _ChunkSink()
+        # One row group per fetched batch, flushed to the client as it is written
+        self.writer = pq.ParquetWriter(self.sink, self.schema)
+
+    def header(self) -> bytes:
+        return self.sink.drain()
+
+    def encode(self, rows) -> bytes:
+        columns = list(zip(*rows))
+        arrays = [
+            [str(value) if value is not None else None for value in values] if kind == "uuid" else list(values)
+            for values, kind in zip(columns, self.kinds)
+        ]
+        self.writer.write_table(self.pa.Table.from_arrays(
+            [self.pa.array(values, type=field.type) for values, field in zip(arrays, self.schema)],
+            schema=self.schema
+        ))
+        return self.sink.drain()
+
+    def finish(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+EXPORT_ENCODERS = {
+    ExportFormat.csv: _CsvEncoder,
+    ExportFormat.ndjson: _NdjsonEncoder,
+    ExportFormat.parquet: _ParquetEncoder,
+}
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def stream_export(
+    dataset_name: ExportDatasetName,
+    export_format: ExportFormat,
+    cafe_id: UUID,
+    start: date,
+    end: date
+) -> AsyncIterator[bytes]:
+    """Encoded export of a dataset for a date range, see stream_query"""
+    dataset = EXPORT_DATASETS[dataset_name]
+    async for chunk in stream_query(dataset.query(cafe_id, start, end), dataset.columns, export_format):
+        yield chunk
+
+
+async def stream_query(
+    query: Select,
+    columns: List[Tuple[str, str]],
+    export_format: ExportFormat
+) -> AsyncIterator[bytes]:
+    """
+    Encoded rows of query, produced batch by batch.
+
+    Rows come from a server-side cursor on a connection of its own (the request's
+    session is closed before a streamed body is sent), so memory stays bounded by
+    EXPORT_BATCH_SIZE however many rows match.
+    """
+    encoder = EXPORT_ENCODERS[export_format](columns)
+
+    async with async_engine.connect() as conn:
+        result = await conn.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        yield encoder.header()
+        async for rows in result.partitions():
+            yield encoder.encode(rows)
+        yield encoder.finish()
@@ -0,0 +1,36 @@
+from datetime import date
+from typing import Any, Dict, Iterable, Optional
+from uuid import UUID
+from sqlalchemy.orm import Query, Session
+
+
+def as_of_query(db: Session, entity_column, *value_columns, on_date: Optional[date] = None) -> Query:
+    """
+    Latest row per entity of a *_history table, as (entity_id, *values).
+
+    Only rows with start_date <= on_date are considered; with no date the most
+    recent row wins, including future-dated ones. Uses DISTINCT ON so Postgres
+    can answer from the (entity_id, start_date DESC) index. Callers may add
+    filters and joins, or turn it into a subquery.
+    """
+    model = entity_column.class_
+    query = db.query(entity_column, *value_columns)
+    if on_date is not None:
+        query = query.filter(model.start_date <= on_date)
+    return query.distinct(entity_column).order_by(entity_column, model.start_date.desc())
+
+
+def latest_as_of(
+    db: Session,
+    entity_column,
+    value_column,
+    entity_ids: Iterable[UUID],
+    on_date: Optional[date] = None
+) -> Dict[UUID, Any]:
+    """Resolve value_column as of on_date for many entities in one query"""
+    ids = set(entity_ids)
+    if not ids:
+        return {}
+
+    rows = as_of_query(db, entity_column, value_column, on_date=on_date).filter(entity_column.in_(ids))
+    return {entity_id: value for entity_id, value in rows}
@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List
+from app.core.config import settings
+
+# Longest edge in pixels of each generated variant; smaller images are not upscaled
+IMAGE_VARIANTS = {
+    "thumbnail": 160,
+    "card": 480,
+    "full": 1200,
+}
+
+# Uploads larger than this many pixels are rejected before decoding (decompression bombs)
+MAX_IMAGE_PIXELS = 40_000_000
+
+IMAGE_MEDIA_TYPES = {
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+
+
+class InvalidImageError(ValueError):
+    """Raised when an upload cannot be decoded as an image"""
+
+
+@dataclass
+class EncodedImage:
+    variant: str
+    image_format: str
+    width: int
+    height: int
+    data: bytes
+
+    @property
+    def filename(self) -> str:
+        """Content-hash name, so a stored file never changes and can be cached forever"""
+        return f"{hashlib.sha256(self.data).hexdigest()[:32]}.{self.image_format}"
+
+    @property
+    def media_type(self) -> str:
+        return IMAGE_MEDIA_TYPES[self.image_format]
+
+
+def image_formats() -> List[str]:
+    """Formats every variant is encoded in; AVIF only when Pillow was built with it"""
+    from PIL import features
+
+    formats = ["webp"]
+    if settings.IMAGE_AVIF_ENABLED and features.check("avif"):
+        formats.append("avif")
+    return formats
+
+
+def encode_variants(content: bytes, formats: List[str]) -> List[EncodedImage]:
+    """
+    Resize an uploaded image to every IMAGE_VARIANTS size and encode each in formats.
+
+    CPU bound; runs in the image process pool through generate_variants.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    try:
+        with Image.open(io.BytesIO(content)) as source:
+            # Pillow only raises past twice its limit, so check the header's size here
+            if source.width * source.height > MAX_IMAGE_PIXELS:
+                raise InvalidImageError(f"Image is larger than {MAX_IMAGE_PIXELS} pixels")
+            source.load()
+            # Phone photos are stored sideways with an EXIF rotation
+            image = ImageOps.exif_transpose(source)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise InvalidImageError("File is not a supported image") from e
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+    encoded = []
+    for variant, size in IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for image_format in formats:
+            buffer = io.BytesIO()
+            if image_format == "webp":
+                resized.save(buffer, "WEBP", quality=settings.IMAGE_QUALITY, method=4)
+            else:
+                resized.save(buffer, "AVIF", quality=settings.IMAGE_QUALITY)
+            encoded.append(EncodedImage(variant, image_format, resized.width, resized.height, buffer.getvalue()))
+
+    return encoded
+
+
+# Separate processes so resizing and encoding use every core without holding the GIL;
+# spawned rather than forked from a server that already runs threads and pools
+_image_executor = ProcessPoolExecutor(
+    max_workers=settings.IMAGE_PROCESS_WORKERS,
+    mp_context=multiprocessing.get_context("spawn")
+)
+
+
+async def generate_variants(content: bytes) -> List[EncodedImage]:
+    """encode_variants on the image process pool instead of the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_image_executor, encode_variants, content, image_formats())
+
+
+def shutdown_image_executor() -> None:
+    """Stop the image worker processes, on application shutdown"""
+    _image_executor.shutdown(wait=True, cancel_futures=True)
+
+
+def variant_map(images: List[EncodedImage], urls: Dict[str, str]) -> Dict[str, dict]:
+    """
+    srcset-style description of stored variants, as kept in menu_items.image_variants:
+    {variant: {"width", "height", <format>: url}} with urls by filename.
+    """
+    variants: Dict[str, dict] = {}
+    for image in images:
+        entry = variants.setdefault(image.variant, {"width": image.width, "height": image.height})
+        entry[image.image_format] = urls[image.filename]
+    return variants
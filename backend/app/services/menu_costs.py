@@ -0,0 +1,249 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+from sqlalchemy import and_, func, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.menu import MenuItem, MenuItemCost, MenuItemRecipe, MenuPriceHistory
+from app.models.order import Order, OrderItem
+from app.models.stock import StockCostHistory
+from app.services.daily_summary import business_day_start
+from app.services.history import as_of_query
+from app.services.pricing import load_recipes, recipe_costs, recipe_stock_items
+
+COST_FIELDS = ("sale_price", "unit_cost", "margin", "margin_percent", "cost_effective_date")
+
+# A menu item is popular when it sells at least this share of an even split of sales
+POPULARITY_FACTOR = Decimal("0.7")
+
+# Largest value menu_item_cost.margin_percent (NUMERIC(7, 2)) can hold
+MAX_MARGIN_PERCENT = Decimal("99999.99")
+
+
+def margin_percent(margin: Optional[Decimal], sale_price: Optional[Decimal]) -> Optional[Decimal]:
+    """
+    Margin as a percentage of the sale price, or None without a price or when
+    it is out of the column's range (a recipe costing over ~1000x the price is
+    a data entry error, and must not make every cost refresh fail)
+    """
+    if margin is None or not sale_price:
+        return None
+    percent = round(margin / sale_price * 100, 2)
+    return percent if abs(percent) <= MAX_MARGIN_PERCENT else None
+
+
+def menu_items_using(db: Session, stock_item_ids: Iterable[UUID]) -> set:
+    """Menu items whose recipe uses any of the stock items"""
+    ids = set(stock_item_ids)
+    if not ids:
+        return set()
+    return {
+        menu_item_id for (menu_item_id,) in db.query(MenuItemRecipe.menu_item_id).filter(
+            MenuItemRecipe.stock_item_id.in_(ids)
+        ).distinct()
+    }
+
+
+def refresh_menu_item_costs(
+    db: Session,
+    menu_item_ids: Optional[Iterable[UUID]] = None,
+    cafe_id: Optional[UUID] = None,
+    on_date: Optional[date] = None
+) -> Dict[UUID, dict]:
+    """
+    Recompute menu_item_cost rows as of on_date (default today).
+
+    Limited to the given menu items and/or cafe; with neither, every menu item
+    is refreshed. Reads recipes and costs directly rather than through the
+    recipe cost cache, so it sees changes made earlier in the same transaction;
+    call it before committing them. Returns the new rows by menu item.
+    """
+    on_date = on_date or date.today()
+
+    items = db.query(MenuItem.id, MenuItem.cafe_id)
+    if menu_item_ids is not None:
+        ids = set(menu_item_ids)
+        if not ids:
+            return {}
+        items = items.filter(MenuItem.id.in_(ids))
+    if cafe_id:
+        items = items.filter(MenuItem.cafe_id == cafe_id)
+    items = items.all()
+    if not items:
+        return {}
+    ids = [menu_item_id for menu_item_id, _ in items]
+
+    prices = dict(as_of_query(
+        db, MenuPriceHistory.menu_item_id, MenuPriceHistory.sale_price, on_date=on_date
+    ).filter(MenuPriceHistory.menu_item_id.in_(ids)))
+
+    recipes = load_recipes(db, ids)
+    stock_item_ids = recipe_stock_items(recipes)
+    stock_costs, cost_dates = {}, {}
+    if stock_item_ids:
+        cost_rows = as_of_query(
+            db, StockCostHistory.stock_item_id, StockCostHistory.cost_per_unit, StockCostHistory.start_date,
+            on_date=on_date
+        ).filter(StockCostHistory.stock_item_id.in_(stock_item_ids))
+        for stock_item_id, cost_per_unit, start_date in cost_rows:
+            stock_costs[stock_item_id] = cost_per_unit
+            cost_dates[stock_item_id] = start_date
+    unit_costs = recipe_costs(recipes, stock_costs)
+
+    # Scheduled changes after on_date end the validity of the computed row
+    next_price_change = dict(db.query(
+        MenuPriceHistory.menu_item_id, func.min(MenuPriceHistory.start_date)
+    ).filter(
+        MenuPriceHistory.menu_item_id.in_(ids), MenuPriceHistory.start_date > on_date
+    ).group_by(MenuPriceHistory.menu_item_id))
+    next_cost_change = dict(db.query(
+        StockCostHistory.stock_item_id, func.min(StockCostHistory.start_date)
+    ).filter(
+        StockCostHistory.stock_item_id.in_(stock_item_ids), StockCostHistory.start_date > on_date
+    ).group_by(StockCostHistory.stock_item_id)) if stock_item_ids else {}
+
+    rows = {}
+    for menu_item_id, item_cafe_id in items:
+        recipe = recipes.get(menu_item_id, [])
+        sale_price = prices.get(menu_item_id)
+        unit_cost = unit_costs.get(menu_item_id, Decimal("0"))
+        margin = sale_price - unit_cost if sale_price is not None else None
+        changes = [next_price_change.get(menu_item_id)] + [
+            next_cost_change.get(stock_item_id) for stock_item_id, _ in recipe
+        ]
+        used_cost_dates = [cost_dates[stock_item_id] for stock_item_id, _ in recipe if stock_item_id in cost_dates]
+
+        rows[menu_item_id] = {
+            "menu_item_id": menu_item_id,
+            "cafe_id": item_cafe_id,
+            "sale_price": sale_price,
+            "unit_cost": unit_cost,
+            "margin": margin,
+            "margin_percent": margin_percent(margin, sale_price),
+            "cost_effective_date": max(used_cost_dates, default=None),
+            "valid_from": on_date,
+            "valid_until": min((change for change in changes if change), default=None)
+        }
+
+    table = MenuItemCost.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.menu_item_id],
+        set_={
+            **{column: stmt.excluded[column] for column in (*COST_FIELDS, "cafe_id", "valid_from", "valid_until")},
+            "refreshed_at": func.now()
+        }
+    )
+    db.execute(stmt, list(rows.values()))
+
+    return rows
+
+
+def current_cost_join(on_date: date):
+    """Join condition from MenuItem to its menu_item_cost row, if still valid on on_date"""
+    return and_(
+        MenuItemCost.menu_item_id == MenuItem.id,
+        MenuItemCost.valid_from <= on_date,
+        or_(MenuItemCost.valid_until.is_(None), MenuItemCost.valid_until > on_date)
+    )
+
+
+def resolve_menu_item_costs(db: Session, cost_rows: Dict[UUID, Optional[MenuItemCost]]) -> Dict[UUID, dict]:
+    """
+    Cost values of menu items from their rows read through current_cost_join.
+
+    Items without a valid row (new, or past a scheduled price/cost change) are
+    refreshed first, in the caller's transaction.
+    """
+    costs = {
+        menu_item_id: {field: getattr(row, field) for field in COST_FIELDS}
+        for menu_item_id, row in cost_rows.items() if row is not None
+    }
+
+    stale = [menu_item_id for menu_item_id, row in cost_rows.items() if row is None]
+    if stale:
+        refreshed = refresh_menu_item_costs(db, stale)
+        costs.update({
+            menu_item_id: {field: row[field] for field in COST_FIELDS}
+            for menu_item_id, row in refreshed.items()
+        })
+
+    return costs
+
+
+def menu_engineering(db: Session, cafe_id: UUID, start: date, end: date) -> dict:
+    """
+    Menu engineering matrix for a cafe over the business days [start, end].
+
+    Each item gets its current margin and the units sold in the period, and is
+    classified by popularity (menu mix at least POPULARITY_FACTOR of an even
+    share) and profitability (margin at least the sales-weighted average) as a
+    star, plowhorse, puzzle or dog.
+    """
+    sold = db.query(
+        OrderItem.menu_item_id,
+        func.sum(OrderItem.quantity).label("units_sold"),
+        func.sum(OrderItem.price_at_sale * OrderItem.quantity).label("revenue"),
+        func.sum((OrderItem.price_at_sale - OrderItem.cost_at_sale) * OrderItem.quantity).label("gross_profit")
+    ).join(Order).filter(
+        Order.cafe_id == cafe_id,
+        Order.timestamp >= business_day_start(start),
+        Order.timestamp < business_day_start(end + timedelta(days=1))
+    ).group_by(OrderItem.menu_item_id).subquery()
+
+    rows = db.query(
+        MenuItem.id, MenuItem.name, MenuItem.category_id,
+        func.coalesce(sold.c.units_sold, 0),
+        func.coalesce(sold.c.revenue, 0),
+        func.coalesce(sold.c.gross_profit, 0),
+        MenuItemCost
+    ).outerjoin(sold, sold.c.menu_item_id == MenuItem.id).outerjoin(
+        MenuItemCost, current_cost_join(date.today())
+    ).filter(
+        MenuItem.cafe_id == cafe_id
+    ).order_by(MenuItem.name).all()
+
+    costs = resolve_menu_item_costs(db, {row[0]: row[6] for row in rows})
+
+    total_units = sum(row[3] for row in rows)
+    popularity_threshold = (
+        POPULARITY_FACTOR * 100 / len(rows) if rows else Decimal("0")
+    )
+    priced = [(costs[row[0]]["margin"], row[3]) for row in rows if costs[row[0]]["margin"] is not None]
+    priced_units = sum(units for _, units in priced)
+    if priced_units:
+        average_margin = sum(margin * units for margin, units in priced) / priced_units
+    elif priced:
+        average_margin = sum(margin for margin, _ in priced) / len(priced)
+    else:
+        average_margin = Decimal("0")
+
+    items: List[dict] = []
+    for menu_item_id, name, category_id, units_sold, revenue, gross_profit, _ in rows:
+        cost = costs[menu_item_id]
+        menu_mix = Decimal(units_sold) * 100 / total_units if total_units else Decimal("0")
+        popular = total_units > 0 and menu_mix >= popularity_threshold
+        profitable = cost["margin"] is not None and cost["margin"] >= average_margin
+        items.append({
+            "menu_item_id": menu_item_id,
+            "name": name,
+            "category_id": category_id,
+            **cost,
+            "units_sold": units_sold,
+            "revenue": revenue,
+            "gross_profit": gross_profit,
+            "menu_mix_percent": round(menu_mix, 2),
+            "classification": (
+                ("star" if profitable else "plowhorse") if popular
+                else ("puzzle" if profitable else "dog")
+            )
+        })
+
+    return {
+        "start_date": start,
+        "end_date": end,
+        "average_margin": round(average_margin, 3),
+        "popularity_threshold_percent": round(popularity_threshold, 2),
+        "items": items
+    }
@@ -0,0 +1,206 @@
+import csv
+import io
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.models.menu import MenuItem
+from app.models.order import Order, OrderItem
+from app.models.staff import Staff
+from app.models.stock import StockTransactionType
+from app.services.daily_summary import business_day, business_timestamp, record_daily_summary
+from app.services.pricing import OrderPricer, PriceNotFoundError
+from app.services.resource_versions import Resource, bump_resource_versions
+from app.services.stock_ledger import apply_stock_deltas, ledger_rows, record_stock_transactions
+
+CSV_REQUIRED_COLUMNS = ("staff_id", "menu_item_id", "quantity")
+
+
+@dataclass
+class BulkOrder:
+    # Position reported back in errors: index in the request, or CSV line number
+    row: int
+    staff_id: UUID
+    items: List[Tuple[UUID, int]]
+    timestamp: Optional[datetime] = None
+
+
+@dataclass
+class BulkImportResult:
+    order_ids: List[UUID] = field(default_factory=list)
+    total_revenue: Decimal = Decimal("0")
+    total_cost: Decimal = Decimal("0")
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+
+def import_orders(
+    db: Session,
+    cafe_id: UUID,
+    orders: Sequence[BulkOrder],
+    dry_run: bool = False,
+    created_by: Optional[UUID] = None
+) -> BulkImportResult:
+    """
+    Validate, price and store many orders at once.
+
+    Orders that fail validation are reported per row and skipped; the others are
+    written with one multi-row INSERT per table (usage ledger rows included), one
+    stock UPDATE for all their ingredients and one summary upsert per sale date (and a stock listing version bump). Nothing is written on a
+    dry run. The caller commits.
+    """
+    result = BulkImportResult()
+
+    staff_ids = {order.staff_id for order in orders}
+    menu_item_ids = {menu_item_id for order in orders for menu_item_id, _ in order.items}
+    cafe_staff = {
+        staff_id for (staff_id,) in db.query(Staff.id).filter(
+            Staff.cafe_id == cafe_id, Staff.id.in_(staff_ids)
+        )
+    } if staff_ids else set()
+    cafe_menu_items = {
+        menu_item_id for (menu_item_id,) in db.query(MenuItem.id).filter(
+            MenuItem.cafe_id == cafe_id, MenuItem.id.in_(menu_item_ids)
+        )
+    } if menu_item_ids else set()
+
+    # Prices and costs depend on the sale date, so price each day's orders together
+    now = business_timestamp()
+    orders_by_date: Dict[date, List[Tuple[BulkOrder, datetime]]] = {}
+    for order in orders:
+        timestamp = business_timestamp(order.timestamp) if order.timestamp else now
+        orders_by_date.setdefault(business_day(timestamp), []).append((order, timestamp))
+
+    order_rows, item_rows, usage_rows = [], [], []
+    stock_usage: Dict[UUID, Decimal] = {}
+    day_totals: Dict[date, List] = {}
+    accepted: List[Tuple[int, UUID]] = []
+
+    for sale_date, day_orders in sorted(orders_by_date.items()):
+        pricer = OrderPricer(db, {
+            menu_item_id for order, _ in day_orders
+            for menu_item_id, _ in order.items if menu_item_id in cafe_menu_items
+        }, sale_date)
+
+        for order, timestamp in day_orders:
+            error = _validate(order, cafe_staff, cafe_menu_items)
+            if error:
+                result.errors.append((order.row, error))
+                continue
+
+            try:
+                priced = pricer.price_lines(
+                    (menu_item_id, quantity) for menu_item_id, quantity in order.items if quantity
+                )
+            except PriceNotFoundError as e:
+                result.errors.append((order.row, str(e)))
+                continue
+
+            order_id = uuid4()
+            accepted.append((order.row, order_id))
+            order_rows.append({
+                "id": order_id,
+                "cafe_id": cafe_id,
+                "staff_id": order.staff_id,
+                "timestamp": timestamp
+            })
+            item_rows.extend({
+                "id": uuid4(),
+                "order_id": order_id,
+                "menu_item_id": line.menu_item_id,
+                "quantity": line.quantity,
+                "price_at_sale": line.price_at_sale,
+                "cost_at_sale": line.cost_at_sale
+            } for line in priced.lines)
+
+            usage_rows.extend(ledger_rows(
+                {stock_item_id: -quantity for stock_item_id, quantity in priced.stock_usage.items()},
+                StockTransactionType.usage,
+                notes=f"Order {order_id}",
+                created_by=created_by,
+                created_at=timestamp,
+                order_id=order_id
+            ))
+            for stock_item_id, quantity in priced.stock_usage.items():
+                stock_usage[stock_item_id] = stock_usage.get(stock_item_id, Decimal("0")) + quantity
+
+            totals = day_totals.setdefault(sale_date, [Decimal("0"), Decimal("0"), 0])
+            totals[0] += priced.total_revenue
+            totals[1] += priced.total_cost
+            totals[2] += 1
+            result.total_revenue += priced.total_revenue
+            result.total_cost += priced.total_cost
+
+    result.order_ids = [order_id for _, order_id in sorted(accepted, key=lambda entry: entry[0])]
+    result.errors.sort(key=lambda error: error[0])
+
+    if dry_run or not order_rows:
+        return result
+
+    db.execute(insert(Order.__table__), order_rows)
+    db.execute(insert(OrderItem.__table__), item_rows)
+
+    apply_stock_deltas(db, {
+        stock_item_id: -quantity for stock_item_id, quantity in stock_usage.items()
+    })
+    record_stock_transactions(db, usage_rows)
+
+    for sale_date, (revenue, cogs, order_count) in day_totals.items():
+        record_daily_summary(db, cafe_id, sale_date, revenue=revenue, cogs=cogs, order_count=order_count)
+    bump_resource_versions(db, cafe_id, Resource.stock)
+
+    return result
+
+
+def _validate(order: BulkOrder, cafe_staff: set, cafe_menu_items: set) -> Optional[str]:
+    if order.staff_id not in cafe_staff:
+        return f"Staff {order.staff_id} not found in this cafe"
+
+    for menu_item_id, quantity in order.items:
+        if menu_item_id not in cafe_menu_items:
+            return f"Menu item {menu_item_id} not found in this cafe"
+        if quantity < 0:
+            return f"Negative quantity for menu item {menu_item_id}"
+
+    # Sales sheets list every item, so zero quantities are skipped rather than rejected
+    if not any(quantity for _, quantity in order.items):
+        return "Order has no items"
+
+    return None
+
+
+def parse_orders_csv(content: str) -> Tuple[List[BulkOrder], List[Tuple[int, str]]]:
+    """
+    Read a sales sheet with one line per (staff member, menu item) tally.
+
+    Columns: staff_id, menu_item_id, quantity and an optional ISO timestamp (or
+    date). Lines with the same staff member and timestamp form one order, as one
+    staff member's end-of-day report. Rows are numbered by CSV line.
+    """
+    reader = csv.DictReader(io.StringIO(content))
+    missing = [column for column in CSV_REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        return [], [(1, f"Missing column(s): {', '.join(missing)}")]
+
+    grouped: Dict[Tuple[UUID, Optional[datetime]], BulkOrder] = {}
+    errors: List[Tuple[int, str]] = []
+
+    for line_number, record in enumerate(reader, start=2):
+        try:
+            staff_id = UUID(record["staff_id"].strip())
+            menu_item_id = UUID(record["menu_item_id"].strip())
+            quantity = int(record["quantity"].strip())
+            raw_timestamp = (record.get("timestamp") or "").strip()
+            timestamp = datetime.fromisoformat(raw_timestamp) if raw_timestamp else None
+        except (AttributeError, ValueError) as e:
+            errors.append((line_number, f"Invalid value: {e}"))
+            continue
+
+        key = (staff_id, timestamp)
+        if key not in grouped:
+            grouped[key] = BulkOrder(row=line_number, staff_id=staff_id, items=[], timestamp=timestamp)
+        grouped[key].items.append((menu_item_id, quantity))
+
+    return list(grouped.values()), errors
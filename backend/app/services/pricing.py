@@ -0,0 +1,288 @@
+import threading
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.cafe import CafeResourceVersion
+from app.models.menu import MenuItem, MenuPriceHistory, MenuItemRecipe
+from app.models.stock import StockCostHistory
+from app.services.history import latest_as_of
+from app.services.resource_versions import Resource
+
+
+class PriceNotFoundError(ValueError):
+    """Raised when a menu item has no price valid on the sale date"""
+
+    def __init__(self, menu_item_id: UUID):
+        super().__init__(f"No price found for menu item {menu_item_id}")
+        self.menu_item_id = menu_item_id
+
+
+@dataclass
+class PricedLine:
+    menu_item_id: UUID
+    menu_item_name: str
+    quantity: int
+    price_at_sale: Decimal
+    cost_at_sale: Decimal
+
+
+@dataclass
+class PricedOrder:
+    lines: List[PricedLine] = field(default_factory=list)
+    # Stock consumed by the whole order, aggregated per ingredient
+    stock_usage: Dict[UUID, Decimal] = field(default_factory=dict)
+    total_revenue: Decimal = Decimal("0")
+    total_cost: Decimal = Decimal("0")
+
+
+def load_recipes(db: Session, menu_item_ids: Iterable[UUID]) -> Dict[UUID, List[Tuple[UUID, Decimal]]]:
+    """Recipes of many menu items as {menu_item_id: [(stock_item_id, quantity_used)]}"""
+    recipes: Dict[UUID, List[Tuple[UUID, Decimal]]] = {}
+    ids = set(menu_item_ids)
+    if not ids:
+        return recipes
+
+    recipe_rows = db.query(
+        MenuItemRecipe.menu_item_id, MenuItemRecipe.stock_item_id, MenuItemRecipe.quantity_used
+    ).filter(MenuItemRecipe.menu_item_id.in_(ids))
+    for item_id, stock_item_id, quantity_used in recipe_rows:
+        recipes.setdefault(item_id, []).append((stock_item_id, quantity_used))
+    return recipes
+
+
+def recipe_stock_items(recipes: Dict[UUID, List[Tuple[UUID, Decimal]]]) -> set:
+    return {stock_item_id for recipe in recipes.values() for stock_item_id, _ in recipe}
+
+
+def load_stock_costs(db: Session, stock_item_ids: Iterable[UUID], effective_date: date) -> Dict[UUID, Decimal]:
+    """Latest cost per unit valid on the date for many stock items"""
+    return latest_as_of(
+        db, StockCostHistory.stock_item_id, StockCostHistory.cost_per_unit, stock_item_ids, effective_date
+    )
+
+
+def recipe_costs(
+    recipes: Dict[UUID, List[Tuple[UUID, Decimal]]],
+    stock_costs: Dict[UUID, Decimal]
+) -> Dict[UUID, Decimal]:
+    """Cost of one unit of each menu item; ingredients without a cost count as free"""
+    return {
+        item_id: sum(
+            (quantity_used * stock_costs[stock_item_id]
+             for stock_item_id, quantity_used in recipe
+             if stock_item_id in stock_costs),
+            Decimal("0")
+        )
+        for item_id, recipe in recipes.items()
+    }
+
+
+class RecipeCostCache:
+    """
+    Recipe and unit cost of menu items per date and cafe costs version, with a
+    reverse index from ingredients to the menu items using them, so recipe and
+    stock cost changes drop exactly the entries they affect in this process.
+
+    Other processes see the change through the version: every such write bumps
+    the cafe's Resource.costs counter, so entries cached before it no longer
+    match. Entries loaded while an invalidation happened are not stored (see
+    generation), so a slow reader cannot put back what a writer just dropped.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._entries = TTLCache(max_size, ttl_seconds)
+        self._menu_items_by_stock_item: Dict[UUID, set] = {}
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def get(
+        self, menu_item_id: UUID, on_date: date, version: int
+    ) -> Optional[Tuple[List[Tuple[UUID, Decimal]], Decimal]]:
+        return self._entries.get((menu_item_id, on_date, version))
+
+    def set(
+        self,
+        menu_item_id: UUID,
+        on_date: date,
+        version: int,
+        recipe: List[Tuple[UUID, Decimal]],
+        cost: Decimal,
+        generation: int
+    ) -> None:
+        with self._lock:
+            if generation != self.generation:
+                return
+            for stock_item_id, _ in recipe:
+                self._menu_items_by_stock_item.setdefault(stock_item_id, set()).add(menu_item_id)
+            self._entries.set((menu_item_id, on_date, version), (recipe, cost))
+
+    def invalidate_menu_items(self, menu_item_ids: Iterable[UUID]) -> None:
+        """Drop every date of these menu items, after their recipe changed"""
+        ids = set(menu_item_ids)
+        with self._lock:
+            self.generation += 1
+            self._entries.delete_where(lambda key: key[0] in ids)
+
+    def invalidate_stock_items(self, stock_item_ids: Iterable[UUID]) -> None:
+        """Drop the menu items using these ingredients, after their cost changed"""
+        with self._lock:
+            menu_item_ids = set()
+            for stock_item_id in stock_item_ids:
+                menu_item_ids |= self._menu_items_by_stock_item.pop(stock_item_id, set())
+        self.invalidate_menu_items(menu_item_ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._menu_items_by_stock_item.clear()
+
+
+recipe_cost_cache = RecipeCostCache(settings.RECIPE_COST_CACHE_MAX_SIZE, settings.RECIPE_COST_CACHE_TTL_SECONDS)
+
+
+def costs_versions(db: Session, menu_item_ids: Iterable[UUID]) -> Dict[UUID, int]:
+    """Current Resource.costs version of each menu item's cafe, in one query"""
+    ids = set(menu_item_ids)
+    if not ids:
+        return {}
+    return dict(db.query(MenuItem.id, func.coalesce(CafeResourceVersion.version, 0)).outerjoin(
+        CafeResourceVersion, and_(
+            CafeResourceVersion.cafe_id == MenuItem.cafe_id,
+            CafeResourceVersion.resource == Resource.costs.value
+        )
+    ).filter(MenuItem.id.in_(ids)))
+
+
+def load_recipe_costs(
+    db: Session,
+    menu_item_ids: Iterable[UUID],
+    effective_date: date
+) -> Tuple[Dict[UUID, List[Tuple[UUID, Decimal]]], Dict[UUID, Decimal]]:
+    """
+    Recipes and unit costs of many menu items on a date, as (recipes, costs).
+
+    Served from recipe_cost_cache after one version lookup; misses are loaded
+    together in two more queries. The version is read first, so an entry
+    stored under it never predates the write that set it.
+    """
+    recipes: Dict[UUID, List[Tuple[UUID, Decimal]]] = {}
+    costs: Dict[UUID, Decimal] = {}
+    missing = set()
+    ids = set(menu_item_ids)
+    versions = costs_versions(db, ids)
+    for menu_item_id in ids:
+        cached = recipe_cost_cache.get(menu_item_id, effective_date, versions.get(menu_item_id, 0))
+        if cached is None:
+            missing.add(menu_item_id)
+        else:
+            recipes[menu_item_id], costs[menu_item_id] = cached
+
+    if missing:
+        generation = recipe_cost_cache.generation
+        loaded = load_recipes(db, missing)
+        loaded_costs = recipe_costs(loaded, load_stock_costs(db, recipe_stock_items(loaded), effective_date))
+        for menu_item_id in missing:
+            recipe = loaded.get(menu_item_id, [])
+            cost = loaded_costs.get(menu_item_id, Decimal("0"))
+            recipe_cost_cache.set(
+                menu_item_id, effective_date, versions.get(menu_item_id, 0), recipe, cost, generation
+            )
+            if recipe:
+                recipes[menu_item_id] = recipe
+            costs[menu_item_id] = cost
+
+    return recipes, costs
+
+
+def get_recipe_costs(db: Session, menu_item_ids: Iterable[UUID], effective_date: date) -> Dict[UUID, Decimal]:
+    """Cost of goods of many menu items on a date, in at most three queries"""
+    return load_recipe_costs(db, menu_item_ids, effective_date)[1]
+
+
+class OrderPricer:
+    """
+    Resolves prices, recipe costs, recipes and names for a set of menu items
+    on a given date using a fixed number of queries, whatever the number of items
+    (recipes and costs usually come from recipe_cost_cache).
+    """
+
+    def __init__(self, db: Session, menu_item_ids: Iterable[UUID], effective_date: date):
+        self.effective_date = effective_date
+        ids = set(menu_item_ids)
+
+        self.names: Dict[UUID, str] = {}
+        self.prices: Dict[UUID, Decimal] = {}
+        self.recipes: Dict[UUID, List[Tuple[UUID, Decimal]]] = {}
+        self.costs: Dict[UUID, Decimal] = {}
+
+        if not ids:
+            return
+
+        # 1. Names
+        for item_id, name in db.query(MenuItem.id, MenuItem.name).filter(MenuItem.id.in_(ids)):
+            self.names[item_id] = name
+
+        # 2. Latest price per item valid on the date
+        self.prices = latest_as_of(
+            db, MenuPriceHistory.menu_item_id, MenuPriceHistory.sale_price, ids, effective_date
+        )
+
+        # 3. Recipes and unit costs on the date (cached)
+        self.recipes, self.costs = load_recipe_costs(db, ids, effective_date)
+
+    def price(self, menu_item_id: UUID) -> Optional[Decimal]:
+        return self.prices.get(menu_item_id)
+
+    def cost(self, menu_item_id: UUID) -> Decimal:
+        return self.costs.get(menu_item_id, Decimal("0"))
+
+    def name(self, menu_item_id: UUID) -> str:
+        return self.names.get(menu_item_id, "Unknown")
+
+    def recipe(self, menu_item_id: UUID) -> List[Tuple[UUID, Decimal]]:
+        return self.recipes.get(menu_item_id, [])
+
+    def price_lines(self, items: Iterable[Tuple[UUID, int]]) -> PricedOrder:
+        """Price (menu_item_id, quantity) lines of one order with the loaded data"""
+        priced = PricedOrder()
+        for menu_item_id, quantity in items:
+            sale_price = self.price(menu_item_id)
+            if sale_price is None:
+                raise PriceNotFoundError(menu_item_id)
+
+            cost_per_item = self.cost(menu_item_id)
+            priced.lines.append(PricedLine(
+                menu_item_id=menu_item_id,
+                menu_item_name=self.name(menu_item_id),
+                quantity=quantity,
+                price_at_sale=sale_price,
+                cost_at_sale=cost_per_item
+            ))
+            priced.total_revenue += sale_price * quantity
+            priced.total_cost += cost_per_item * quantity
+
+            for stock_item_id, quantity_used in self.recipe(menu_item_id):
+                priced.stock_usage[stock_item_id] = (
+                    priced.stock_usage.get(stock_item_id, Decimal("0")) + quantity_used * quantity
+                )
+
+        return priced
+
+
+def price_order(db: Session, items: Iterable[Tuple[UUID, int]], sale_date: date) -> PricedOrder:
+    """Price all (menu_item_id, quantity) lines of an order in one pass"""
+    items = list(items)
+    pricer = OrderPricer(db, (menu_item_id for menu_item_id, _ in items), sale_date)
+    return pricer.price_lines(items)
+
+
+def calculate_menu_item_cost(db: Session, menu_item_id: UUID, effective_date: date) -> float:
+    """Calculate cost of goods for a menu item on a specific date"""
+    return float(get_recipe_costs(db, [menu_item_id], effective_date).get(menu_item_id, 0))
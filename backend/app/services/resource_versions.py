@@ -0,0 +1,59 @@
+import hashlib
+from enum import Enum
+from uuid import UUID
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.cafe import CafeResourceVersion
+
+
+class Resource(str, Enum):
+    """
+    Families of per-cafe data with a version: listings tagged with it, and
+    recipe costs, which key the per-process recipe cost cache
+    """
+    menu = "menu"
+    categories = "categories"
+    stock = "stock"
+    staff = "staff"
+    costs = "costs"
+
+
+def bump_resource_versions(db: Session, cafe_id: UUID, *resources: Resource) -> None:
+    """
+    Mark listings of a cafe as changed, in the caller's transaction.
+
+    Call it from every write that changes what a listing returns; the new
+    version becomes visible together with the write when the caller commits.
+    """
+    if not resources:
+        return
+
+    table = CafeResourceVersion.__table__
+    stmt = insert(table).values([
+        {"cafe_id": cafe_id, "resource": resource.value, "version": 1} for resource in sorted(set(resources))
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.cafe_id, table.c.resource],
+        set_={"version": table.c.version + 1, "updated_at": func.now()}
+    )
+    db.execute(stmt)
+
+
+def resource_etag(db: Session, cafe_id: UUID, resource: Resource, *variant) -> str:
+    """
+    Strong ETag of a cafe's listing: its current version plus whatever else the
+    response depends on (query parameters, the date for as-of values).
+
+    Read it before running the listing query, so a write committed in between
+    can only make the tag older than the body, never newer.
+    """
+    version = db.query(CafeResourceVersion.version).filter(
+        CafeResourceVersion.cafe_id == cafe_id,
+        CafeResourceVersion.resource == resource.value
+    ).scalar() or 0
+
+    # The API version changes the tag when a release changes the response shape
+    key = repr((settings.VERSION, str(cafe_id), variant)).encode()
+    return f'"{resource.value}-{version}-{hashlib.sha256(key).hexdigest()[:16]}"'
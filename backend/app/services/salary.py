@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy.orm import Session
+from app.models.staff import Staff, StaffSalaryHistory
+
+
+class SalarySchedule:
+    """
+    Salary history of all active staff of a cafe, loaded in one query and turned
+    into effective-date intervals so any day or period can be costed in memory.
+    """
+
+    def __init__(self, db: Session, cafe_id: UUID, until: Optional[date] = None):
+        query = db.query(
+            StaffSalaryHistory.staff_id,
+            StaffSalaryHistory.start_date,
+            StaffSalaryHistory.daily_salary
+        ).join(Staff).filter(
+            Staff.cafe_id == cafe_id,
+            Staff.is_active == True
+        )
+        if until is not None:
+            query = query.filter(StaffSalaryHistory.start_date <= until)
+
+        rows = query.order_by(StaffSalaryHistory.staff_id, StaffSalaryHistory.start_date).all()
+
+        # (start, end, daily_salary) with end exclusive; None means still in effect
+        self.intervals: List[Tuple[date, Optional[date], Decimal]] = []
+        for index, (staff_id, start_date, daily_salary) in enumerate(rows):
+            next_row = rows[index + 1] if index + 1 < len(rows) else None
+            end_date = next_row[1] if next_row and next_row[0] == staff_id else None
+            self.intervals.append((start_date, end_date, daily_salary))
+
+    def _overlap(self, start: date, end: date, interval_start: date, interval_end: Optional[date]) -> Tuple[date, date]:
+        """Intersect [interval_start, interval_end) with the inclusive range [start, end]"""
+        overlap_start = max(start, interval_start)
+        overlap_end = end + timedelta(days=1)
+        if interval_end is not None:
+            overlap_end = min(overlap_end, interval_end)
+        return overlap_start, overlap_end
+
+    def total(self, start: date, end: date) -> Decimal:
+        """Total salary cost for the inclusive range [start, end]"""
+        total_salary = Decimal("0")
+        for interval_start, interval_end, daily_salary in self.intervals:
+            overlap_start, overlap_end = self._overlap(start, end, interval_start, interval_end)
+            if overlap_end > overlap_start:
+                total_salary += daily_salary * (overlap_end - overlap_start).days
+        return total_salary
+
+    def daily_totals(self, start: date, end: date) -> Dict[date, Decimal]:
+        """Salary cost of every day in the inclusive range [start, end]"""
+        days = (end - start).days + 1
+        changes = [Decimal("0")] * (days + 1)
+
+        for interval_start, interval_end, daily_salary in self.intervals:
+            overlap_start, overlap_end = self._overlap(start, end, interval_start, interval_end)
+            if overlap_end > overlap_start:
+                changes[(overlap_start - start).days] += daily_salary
+                changes[(overlap_end - start).days] -= daily_salary
+
+        totals = {}
+        running = Decimal("0")
+        for offset in range(days):
+            running += changes[offset]
+            totals[start + timedelta(days=offset)] = running
+        return totals
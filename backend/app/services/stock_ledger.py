@@ -0,0 +1,169 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID, uuid4
+from sqlalchemy import Numeric, column, func, insert, select, update, values
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from app.models.stock import StockItem, StockTransaction, StockTransactionType
+from app.services.daily_summary import business_day_start, business_timestamp
+from app.services.stock_snapshots import invalidate_stock_snapshots, ledger_balances
+
+# Columns of ledger_query rows, as (name, kind) for the export encoders
+LEDGER_COLUMNS = [
+    ("id", "uuid"), ("created_at", "timestamp"), ("stock_item_id", "uuid"), ("stock_item_name", "text"),
+    ("transaction_type", "text"), ("quantity_change", "decimal"), ("notes", "text"),
+    ("created_by", "uuid"), ("order_id", "uuid")
+]
+
+
+def order_usage(db: Session, order_id: UUID) -> Dict[UUID, Decimal]:
+    """
+    Net stock an order consumed per ingredient, from its ledger rows.
+
+    Negating it undoes the sale exactly, whatever the recipes are now.
+    """
+    return {
+        stock_item_id: -quantity for stock_item_id, quantity in db.query(
+            StockTransaction.stock_item_id, func.sum(StockTransaction.quantity_change)
+        ).filter(
+            StockTransaction.order_id == order_id,
+            StockTransaction.transaction_type.in_([
+                StockTransactionType.usage.value, StockTransactionType.usage_reversal.value
+            ])
+        ).group_by(StockTransaction.stock_item_id)
+        if quantity
+    }
+
+
+def apply_stock_deltas(db: Session, deltas: Dict[UUID, Decimal]) -> Dict[UUID, Decimal]:
+    """
+    Apply signed quantity changes to stock items with a single UPDATE ... FROM (VALUES ...).
+
+    The increment happens inside the database, so concurrent writers cannot lose each
+    other's updates. Returns the new current_quantity of every updated item.
+    """
+    deltas = {stock_item_id: delta for stock_item_id, delta in deltas.items() if delta}
+    if not deltas:
+        return {}
+
+    # Sorted so concurrent orders touching the same items lock rows in the same order
+    delta_rows = values(
+        column("stock_item_id", PGUUID(as_uuid=True)),
+        column("delta", Numeric(10, 3)),
+        name="deltas"
+    ).data(sorted(deltas.items(), key=lambda row: str(row[0])))
+
+    stock_items = StockItem.__table__
+    stmt = update(stock_items).where(
+        stock_items.c.id == delta_rows.c.stock_item_id
+    ).values(
+        current_quantity=stock_items.c.current_quantity + delta_rows.c.delta
+    ).returning(stock_items.c.id, stock_items.c.current_quantity)
+
+    return {stock_item_id: quantity for stock_item_id, quantity in db.execute(stmt)}
+
+
+
+def ledger_rows(
+    deltas: Dict[UUID, Decimal],
+    transaction_type: StockTransactionType,
+    notes: Optional[str] = None,
+    created_by: Optional[UUID] = None,
+    created_at: Optional[datetime] = None,
+    order_id: Optional[UUID] = None
+) -> List[dict]:
+    """StockTransaction rows for signed quantity changes, ready for record_stock_transactions"""
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": uuid4(),
+            "stock_item_id": stock_item_id,
+            "quantity_change": delta,
+            "transaction_type": transaction_type.value,
+            "notes": notes,
+            "created_by": created_by,
+            "created_at": created_at or now,
+            "order_id": order_id
+        }
+        for stock_item_id, delta in sorted(deltas.items(), key=lambda row: str(row[0]))
+        if delta
+    ]
+
+
+def record_stock_transactions(db: Session, rows: List[dict]) -> None:
+    """Append ledger rows with one multi-row INSERT, dropping snapshots they make stale"""
+    if not rows:
+        return
+
+    db.execute(insert(StockTransaction.__table__), rows)
+
+    earliest: Dict[UUID, datetime] = {}
+    for row in rows:
+        stock_item_id, created_at = row["stock_item_id"], business_timestamp(row["created_at"])
+        if stock_item_id not in earliest or created_at < earliest[stock_item_id]:
+            earliest[stock_item_id] = created_at
+    invalidate_stock_snapshots(db, earliest)
+
+def ledger_query(
+    cafe_id: UUID,
+    stock_item_id: Optional[UUID] = None,
+    transaction_types: Optional[Iterable[str]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    created_by: Optional[UUID] = None
+) -> Select:
+    """
+    Stock transactions of a cafe with their item names, as rows of LEDGER_COLUMNS.
+
+    Filters are optional and the dates inclusive business days. The caller
+    picks the order, so the same statement serves keyset pages and streamed
+    exports.
+    """
+    query = select(
+        StockTransaction.id, StockTransaction.created_at, StockTransaction.stock_item_id,
+        StockItem.name.label("stock_item_name"), StockTransaction.transaction_type,
+        StockTransaction.quantity_change, StockTransaction.notes, StockTransaction.created_by,
+        StockTransaction.order_id
+    ).join(StockItem, StockItem.id == StockTransaction.stock_item_id).where(StockItem.cafe_id == cafe_id)
+
+    if stock_item_id:
+        query = query.where(StockTransaction.stock_item_id == stock_item_id)
+    if transaction_types:
+        query = query.where(StockTransaction.transaction_type.in_([StockTransactionType(t).value for t in transaction_types]))
+    if start_date:
+        query = query.where(StockTransaction.created_at >= business_day_start(start_date))
+    if end_date:
+        query = query.where(StockTransaction.created_at < business_day_start(end_date + timedelta(days=1)))
+    if created_by:
+        query = query.where(StockTransaction.created_by == created_by)
+
+    return query
+
+
+def stock_levels(db: Session, cafe_id: UUID, at: datetime) -> List[tuple]:
+    """
+    Quantity of every stock item of the cafe at a point in time, from the ledger.
+
+    Rows are (stock_item_id, name, unit_of_measure, current_quantity,
+    quantity_at, ledger_balance), with ledger_balance as of now. Both come from
+    the nearest snapshot plus the transactions after it, so only the tail of
+    the history is read. Any difference between ledger_balance and
+    current_quantity is stock that changed without a ledger row.
+    """
+    at_balance = ledger_balances(at, cafe_id)
+    now_balance = ledger_balances(datetime.now(timezone.utc), cafe_id)
+
+    return db.query(
+        StockItem.id, StockItem.name, StockItem.unit_of_measure, StockItem.current_quantity,
+        func.coalesce(at_balance.c.balance, 0),
+        func.coalesce(now_balance.c.balance, 0)
+    ).outerjoin(
+        at_balance, at_balance.c.stock_item_id == StockItem.id
+    ).outerjoin(
+        now_balance, now_balance.c.stock_item_id == StockItem.id
+    ).filter(
+        StockItem.cafe_id == cafe_id,
+        StockItem.created_at <= at
+    ).order_by(StockItem.name).all()
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from uuid import UUID
+from sqlalchemy import TIMESTAMP, delete, func, literal, or_, select, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.stock import StockItem, StockSnapshot, StockTransaction
+from app.services.daily_summary import business_timestamp
+
+# Snapshots may only cover time at least this old, so that transactions still
+# being committed are not left out of them
+SNAPSHOT_SETTLE_SECONDS = 60
+
+
+def ledger_balances(at: datetime, cafe_id: Optional[UUID] = None):
+    """
+    Subquery of (stock_item_id, balance, tail_rows): each item's ledger balance
+    as of at, from its latest snapshot at or before at plus the transactions
+    after that snapshot. tail_rows counts those replayed transactions.
+    """
+    latest = select(
+        StockSnapshot.stock_item_id, StockSnapshot.snapshot_at, StockSnapshot.quantity
+    ).where(StockSnapshot.snapshot_at <= at)
+    if cafe_id:
+        latest = latest.join(StockItem, StockItem.id == StockSnapshot.stock_item_id).where(
+            StockItem.cafe_id == cafe_id
+        )
+    latest = latest.distinct(StockSnapshot.stock_item_id).order_by(
+        StockSnapshot.stock_item_id, StockSnapshot.snapshot_at.desc()
+    ).subquery()
+
+    tail = select(
+        StockTransaction.stock_item_id, StockTransaction.quantity_change, literal(1)
+    ).outerjoin(
+        latest, latest.c.stock_item_id == StockTransaction.stock_item_id
+    ).where(
+        StockTransaction.created_at <= at,
+        or_(latest.c.snapshot_at.is_(None), StockTransaction.created_at > latest.c.snapshot_at)
+    )
+    if cafe_id:
+        tail = tail.join(StockItem, StockItem.id == StockTransaction.stock_item_id).where(
+            StockItem.cafe_id == cafe_id
+        )
+
+    parts = union_all(
+        select(latest.c.stock_item_id, latest.c.quantity, literal(0)),
+        tail
+    ).subquery()
+    stock_item_id, quantity, tail_row = parts.c
+
+    return select(
+        stock_item_id.label("stock_item_id"),
+        func.sum(quantity).label("balance"),
+        func.sum(tail_row).label("tail_rows")
+    ).group_by(stock_item_id).subquery()
+
+
+def take_stock_snapshots(db: Session, at: datetime, cafe_id: Optional[UUID] = None) -> int:
+    """
+    Store the ledger balance as of at for every stock item (optionally of one
+    cafe) that has transactions since its previous snapshot; other items are
+    already covered by that snapshot. Returns the number of snapshots written.
+
+    Raises ValueError unless at is SNAPSHOT_SETTLE_SECONDS in the past:
+    invalidate_stock_snapshots ignores newer transactions, so a later
+    snapshot would never be dropped by the writes it misses.
+    """
+    settled = datetime.now(timezone.utc) - timedelta(seconds=SNAPSHOT_SETTLE_SECONDS)
+    if business_timestamp(at) > settled:
+        raise ValueError(f"Snapshots must be at least {SNAPSHOT_SETTLE_SECONDS} seconds in the past")
+
+    balances = ledger_balances(at, cafe_id)
+    table = StockSnapshot.__table__
+    stmt = insert(table).from_select(
+        ["stock_item_id", "snapshot_at", "quantity"],
+        select(
+            balances.c.stock_item_id, literal(at, TIMESTAMP(timezone=True)), balances.c.balance
+        ).where(balances.c.tail_rows > 0)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.stock_item_id, table.c.snapshot_at],
+        set_={"quantity": stmt.excluded.quantity}
+    )
+    return db.execute(stmt).rowcount
+
+
+def invalidate_stock_snapshots(db: Session, earliest: Dict[UUID, datetime]) -> None:
+    """
+    Drop snapshots made stale by transactions dated before them (e.g. a
+    back-dated order). earliest maps stock items to their oldest new created_at.
+    """
+    settled = datetime.now(timezone.utc) - timedelta(seconds=SNAPSHOT_SETTLE_SECONDS)
+    stale = {stock_item_id: moment for stock_item_id, moment in earliest.items() if business_timestamp(moment) <= settled}
+    if stale:
+        db.execute(delete(StockSnapshot).where(
+            StockSnapshot.stock_item_id.in_(stale.keys()),
+            StockSnapshot.snapshot_at >= min(business_timestamp(moment) for moment in stale.values())
+        ))
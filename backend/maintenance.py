@@ -0,0 +1,79 @@
+"""
+Maintenance commands for derived tables.
+
+Usage:
+    python maintenance.py rebuild-daily-summary [--cafe-id ID] [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+    python maintenance.py snapshot-stock [--cafe-id ID] [--at YYYY-MM-DDTHH:MM:SS]
+    python maintenance.py refresh-menu-costs [--cafe-id ID]
+"""
+import argparse
+from datetime import date, datetime
+from uuid import UUID
+from app.core.database import SessionLocal
+from app.services.daily_summary import business_day, business_day_start, business_timestamp, rebuild_daily_summary
+from app.services.menu_costs import refresh_menu_item_costs
+from app.services.stock_snapshots import take_stock_snapshots
+
+def rebuild_daily_summary_command(args):
+    db = SessionLocal()
+    try:
+        rows = rebuild_daily_summary(db, cafe_id=args.cafe_id, start=args.start, end=args.end)
+        db.commit()
+        print(f"Rebuilt {rows} daily summary rows")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+    finally:
+        db.close()
+
+def snapshot_stock_command(args):
+    db = SessionLocal()
+    try:
+        snapshot_at = business_timestamp(args.at) if args.at else business_day_start(business_day())
+        rows = take_stock_snapshots(db, snapshot_at, cafe_id=args.cafe_id)
+        db.commit()
+        print(f"Wrote {rows} stock snapshots at {snapshot_at.isoformat()}")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+    finally:
+        db.close()
+
+def refresh_menu_costs_command(args):
+    db = SessionLocal()
+    try:
+        rows = refresh_menu_item_costs(db, cafe_id=args.cafe_id)
+        db.commit()
+        print(f"Refreshed {len(rows)} menu item costs")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Cafe Management maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = subparsers.add_parser("rebuild-daily-summary", help="Recompute daily_cafe_summary from raw data")
+    rebuild.add_argument("--cafe-id", type=UUID, default=None)
+    rebuild.add_argument("--start", type=date.fromisoformat, default=None)
+    rebuild.add_argument("--end", type=date.fromisoformat, default=None)
+    rebuild.set_defaults(handler=rebuild_daily_summary_command)
+
+    snapshot = subparsers.add_parser(
+        "snapshot-stock", help="Snapshot stock ledger balances (default: start of today), e.g. daily from cron"
+    )
+    snapshot.add_argument("--cafe-id", type=UUID, default=None)
+    snapshot.add_argument("--at", type=datetime.fromisoformat, default=None)
+    snapshot.set_defaults(handler=snapshot_stock_command)
+
+    menu_costs = subparsers.add_parser("refresh-menu-costs", help="Recompute menu_item_cost from recipes, costs and prices")
+    menu_costs.add_argument("--cafe-id", type=UUID, default=None)
+    menu_costs.set_defaults(handler=refresh_menu_costs_command)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
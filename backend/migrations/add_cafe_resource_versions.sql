@@ -0,0 +1,11 @@
+-- Per-cafe change counters behind the ETags of the menu, category, stock and
+-- staff listings. Writes bump the counter of the resource family they change;
+-- a missing row means version 0, so no backfill is needed.
+
+CREATE TABLE IF NOT EXISTS cafe_resource_versions (
+    cafe_id UUID NOT NULL REFERENCES cafes(id) ON DELETE CASCADE,
+    resource TEXT NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (cafe_id, resource)
+);
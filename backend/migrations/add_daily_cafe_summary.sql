@@ -0,0 +1,15 @@
+-- Daily per-cafe rollup of sales, waste and daily expenses
+-- Maintained incrementally by the API; backfill after creating it with:
+--   python maintenance.py rebuild-daily-summary
+
+CREATE TABLE IF NOT EXISTS daily_cafe_summary (
+    cafe_id UUID NOT NULL REFERENCES cafes(id) ON DELETE CASCADE,
+    date DATE NOT NULL,
+    revenue NUMERIC(12, 3) NOT NULL DEFAULT 0,
+    cogs NUMERIC(12, 3) NOT NULL DEFAULT 0,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    waste_cost NUMERIC(12, 3) NOT NULL DEFAULT 0,
+    daily_expenses NUMERIC(12, 3) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (cafe_id, date)
+);
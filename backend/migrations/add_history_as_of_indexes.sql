@@ -0,0 +1,22 @@
+-- Point-in-time ("as of") lookups on the history tables
+-- Every price, cost and salary resolution asks for the latest row per entity with
+-- start_date <= D. These composite indexes answer that with an index-only seek
+-- (see app/services/history.py) and replace the single-column indexes they cover.
+
+CREATE INDEX IF NOT EXISTS idx_staff_salary_history_as_of
+    ON staff_salary_history(staff_id, start_date DESC) INCLUDE (daily_salary);
+CREATE INDEX IF NOT EXISTS idx_stock_cost_history_as_of
+    ON stock_cost_history(stock_item_id, start_date DESC) INCLUDE (cost_per_unit);
+CREATE INDEX IF NOT EXISTS idx_menu_price_history_as_of
+    ON menu_price_history(menu_item_id, start_date DESC) INCLUDE (sale_price);
+
+DROP INDEX IF EXISTS idx_staff_salary_history_staff_id;
+DROP INDEX IF EXISTS idx_staff_salary_history_start_date;
+DROP INDEX IF EXISTS idx_stock_cost_history_stock_item_id;
+DROP INDEX IF EXISTS idx_stock_cost_history_start_date;
+DROP INDEX IF EXISTS idx_menu_price_history_menu_item_id;
+DROP INDEX IF EXISTS idx_menu_price_history_start_date;
+
+ANALYZE staff_salary_history;
+ANALYZE stock_cost_history;
+ANALYZE menu_price_history;
@@ -0,0 +1,20 @@
+-- Current recipe cost and margin per menu item
+-- Maintained by the API when recipes, stock costs or menu prices change, and
+-- refreshed lazily once a scheduled change (valid_until) takes effect.
+-- Fill it after creating it with:
+--   python maintenance.py refresh-menu-costs
+
+CREATE TABLE IF NOT EXISTS menu_item_cost (
+    menu_item_id UUID PRIMARY KEY REFERENCES menu_items(id) ON DELETE CASCADE,
+    cafe_id UUID NOT NULL REFERENCES cafes(id) ON DELETE CASCADE,
+    sale_price NUMERIC(10, 3),
+    unit_cost NUMERIC(14, 6) NOT NULL DEFAULT 0,
+    margin NUMERIC(14, 6),
+    margin_percent NUMERIC(7, 2),
+    cost_effective_date DATE,
+    valid_from DATE NOT NULL,
+    valid_until DATE,
+    refreshed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_menu_item_cost_cafe_id ON menu_item_cost(cafe_id);
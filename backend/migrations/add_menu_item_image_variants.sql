@@ -0,0 +1,5 @@
+-- Resized copies of menu item images generated by the upload endpoint
+-- {variant: {"width": .., "height": .., "webp": url, "avif": url}} for the
+-- thumbnail, card and full variants; NULL for images uploaded before this.
+
+ALTER TABLE menu_items ADD COLUMN IF NOT EXISTS image_variants JSONB;
@@ -0,0 +1,4 @@
+-- Supports keyset pagination of a cafe's order history
+-- (GET /cafes/{cafe_id}/orders/history, newest first)
+
+CREATE INDEX IF NOT EXISTS idx_orders_cafe_timestamp_id ON orders(cafe_id, timestamp DESC, id DESC);
@@ -0,0 +1,12 @@
+-- Keyset pagination of the stock ledger
+-- (GET /cafes/{cafe_id}/stock/ledger and the item history, newest first)
+
+CREATE INDEX IF NOT EXISTS idx_stock_transactions_item_created_id
+    ON stock_transactions(stock_item_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_stock_transactions_created_id
+    ON stock_transactions(created_at DESC, id DESC);
+
+-- Covered by idx_stock_transactions_item_created_id
+DROP INDEX IF EXISTS idx_stock_transactions_item_id;
+
+ANALYZE stock_transactions;
@@ -0,0 +1,12 @@
+-- Periodic stock ledger snapshots
+-- Stock levels at a point in time (GET /cafes/{cafe_id}/stock/levels?at=...) read
+-- the nearest snapshot and replay only the stock_transactions after it.
+-- Take them daily with:
+--   python maintenance.py snapshot-stock
+
+CREATE TABLE IF NOT EXISTS stock_snapshots (
+    stock_item_id UUID NOT NULL REFERENCES stock_items(id) ON DELETE CASCADE,
+    snapshot_at TIMESTAMPTZ NOT NULL,
+    quantity NUMERIC(12, 3) NOT NULL,
+    PRIMARY KEY (stock_item_id, snapshot_at)
+);
@@ -0,0 +1,18 @@
+-- Link sale usage rows (and their reversals) to the order that caused them, so
+-- deleting an order restores exactly the stock its sale consumed even if the
+-- recipes changed in between. Not a foreign key: the link outlives the order.
+-- Safe to run more than once.
+
+ALTER TABLE stock_transactions ADD COLUMN IF NOT EXISTS order_id UUID;
+
+-- Rows written before this migration name their order in the notes ('Order <id>' / 'Order <id> deleted')
+UPDATE stock_transactions
+SET order_id = substring(notes from '^Order ([0-9a-f-]{36})')::uuid
+WHERE order_id IS NULL
+  AND transaction_type IN ('usage', 'usage_reversal')
+  AND notes ~ '^Order [0-9a-f-]{36}';
+
+CREATE INDEX IF NOT EXISTS idx_stock_transactions_order_id
+    ON stock_transactions(order_id) WHERE order_id IS NOT NULL;
+
+ANALYZE stock_transactions;
@@ -0,0 +1,18 @@
+-- Sales now append 'usage' rows to stock_transactions (and order deletions
+-- 'usage_reversal' rows), so stock levels can be rebuilt from the ledger
+-- (GET /cafes/{cafe_id}/stock/levels?at=...).
+-- Backfill usage for orders placed before that, from the current recipes.
+-- Safe to run more than once.
+
+INSERT INTO stock_transactions (stock_item_id, quantity_change, transaction_type, notes, created_at)
+SELECT r.stock_item_id, -SUM(r.quantity_used * oi.quantity), 'usage', 'Order ' || o.id, o.timestamp
+FROM orders o
+JOIN order_items oi ON oi.order_id = o.id
+JOIN menu_item_recipe r ON r.menu_item_id = oi.menu_item_id
+WHERE NOT EXISTS (
+    SELECT 1 FROM stock_transactions t
+    WHERE t.transaction_type = 'usage' AND t.notes = 'Order ' || o.id
+)
+GROUP BY o.id, o.timestamp, r.stock_item_id;
+
+ANALYZE stock_transactions;
@@ -90,10 +90,11 @@ CREATE TABLE stock_transactions (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     stock_item_id UUID NOT NULL REFERENCES stock_items(id) ON DELETE CASCADE,
     quantity_change DECIMAL(10, 3) NOT NULL,
-    transaction_type VARCHAR NOT NULL,
+    transaction_type VARCHAR NOT NULL, -- restock, waste, initial, usage, usage_reversal
     notes TEXT,
     created_at TIMESTAMPTZ DEFAULT NOW(),
-    created_by UUID REFERENCES users(id)
+    created_by UUID REFERENCES users(id),
+    order_id UUID -- Order of usage / usage_reversal rows (no FK: kept after the order is deleted)
 );
 
 -- Stock cost history (for historical cost tracking)
@@ -106,6 +107,14 @@ CREATE TABLE stock_cost_history (
     UNIQUE (stock_item_id, start_date)
 );
 
+-- Stock ledger snapshots (balance including every transaction up to snapshot_at)
+CREATE TABLE stock_snapshots (
+    stock_item_id UUID NOT NULL REFERENCES stock_items(id) ON DELETE CASCADE,
+    snapshot_at TIMESTAMPTZ NOT NULL,
+    quantity NUMERIC(12, 3) NOT NULL,
+    PRIMARY KEY (stock_item_id, snapshot_at)
+);
+
 -- =====================================================
 -- MENU MANAGEMENT TABLES
 -- =====================================================
@@ -116,6 +125,7 @@ CREATE TABLE menu_items (
     cafe_id UUID NOT NULL REFERENCES cafes(id) ON DELETE CASCADE,
     name TEXT NOT NULL,
     image_url TEXT,
+    image_variants JSONB, -- Resized WebP/AVIF copies of image_url by variant (thumbnail, card, full)
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW(),
     UNIQUE (cafe_id, name)
@@ -141,6 +151,20 @@ CREATE TABLE menu_item_recipe (
     UNIQUE (menu_item_id, stock_item_id)
 );
 
+-- Current recipe cost and margin per menu item (maintained by the API)
+CREATE TABLE menu_item_cost (
+    menu_item_id UUID PRIMARY KEY REFERENCES menu_items(id) ON DELETE CASCADE,
+    cafe_id UUID NOT NULL REFERENCES cafes(id) ON DELETE CASCADE,
+    sale_price NUMERIC(10, 3),
+    unit_cost NUMERIC(14, 6) NOT NULL DEFAULT 0,
+    margin NUMERIC(14, 6),
+    margin_percent NUMERIC(7, 2),
+    cost_effective_date DATE,
+    valid_from DATE NOT NULL,
+    valid_until DATE,
+    refreshed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
 -- =====================================================
 -- SALES & ORDER TABLES
 -- =====================================================
@@ -189,6 +213,32 @@ CREATE TABLE daily_expenses (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- =====================================================
+-- REPORTING TABLES
+-- =====================================================
+
+-- Daily per-cafe rollup (maintained by the API, rebuild with backend/maintenance.py)
+CREATE TABLE daily_cafe_summary (
+    cafe_id UUID NOT NULL REFERENCES cafes(id) ON DELETE CASCADE,
+    date DATE NOT NULL,
+    revenue NUMERIC(12, 3) NOT NULL DEFAULT 0,
+    cogs NUMERIC(12, 3) NOT NULL DEFAULT 0,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    waste_cost NUMERIC(12, 3) NOT NULL DEFAULT 0,
+    daily_expenses NUMERIC(12, 3) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (cafe_id, date)
+);
+
+-- Per-cafe change counters of the cached listings (ETags), bumped by writes
+CREATE TABLE cafe_resource_versions (
+    cafe_id UUID NOT NULL REFERENCES cafes(id) ON DELETE CASCADE,
+    resource TEXT NOT NULL, -- menu, categories, stock, staff, costs
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (cafe_id, resource)
+);
+
 -- =====================================================
 -- SUPPLIER & PURCHASE ORDER TABLES (ADVANCED FEATURES)
 -- =====================================================
@@ -237,26 +287,27 @@ CREATE INDEX idx_user_cafe_roles_cafe_id ON user_cafe_roles(cafe_id);
 
 -- Staff indexes
 CREATE INDEX idx_staff_cafe_id ON staff(cafe_id);
-CREATE INDEX idx_staff_salary_history_staff_id ON staff_salary_history(staff_id);
-CREATE INDEX idx_staff_salary_history_start_date ON staff_salary_history(start_date);
+CREATE INDEX idx_staff_salary_history_as_of ON staff_salary_history(staff_id, start_date DESC) INCLUDE (daily_salary);
 
 -- Stock indexes
 CREATE INDEX idx_stock_items_cafe_id ON stock_items(cafe_id);
-CREATE INDEX idx_stock_transactions_item_id ON stock_transactions(stock_item_id);
-CREATE INDEX idx_stock_cost_history_stock_item_id ON stock_cost_history(stock_item_id);
-CREATE INDEX idx_stock_cost_history_start_date ON stock_cost_history(start_date);
+CREATE INDEX idx_stock_transactions_item_created_id ON stock_transactions(stock_item_id, created_at DESC, id DESC);
+CREATE INDEX idx_stock_transactions_created_id ON stock_transactions(created_at DESC, id DESC);
+CREATE INDEX idx_stock_transactions_order_id ON stock_transactions(order_id) WHERE order_id IS NOT NULL;
+CREATE INDEX idx_stock_cost_history_as_of ON stock_cost_history(stock_item_id, start_date DESC) INCLUDE (cost_per_unit);
 
 -- Menu indexes
 CREATE INDEX idx_menu_items_cafe_id ON menu_items(cafe_id);
-CREATE INDEX idx_menu_price_history_menu_item_id ON menu_price_history(menu_item_id);
-CREATE INDEX idx_menu_price_history_start_date ON menu_price_history(start_date);
+CREATE INDEX idx_menu_price_history_as_of ON menu_price_history(menu_item_id, start_date DESC) INCLUDE (sale_price);
 CREATE INDEX idx_menu_item_recipe_menu_item_id ON menu_item_recipe(menu_item_id);
 CREATE INDEX idx_menu_item_recipe_stock_item_id ON menu_item_recipe(stock_item_id);
+CREATE INDEX idx_menu_item_cost_cafe_id ON menu_item_cost(cafe_id);
 
 -- Order indexes
 CREATE INDEX idx_orders_cafe_id ON orders(cafe_id);
 CREATE INDEX idx_orders_staff_id ON orders(staff_id);
 CREATE INDEX idx_orders_timestamp ON orders(timestamp);
+CREATE INDEX idx_orders_cafe_timestamp_id ON orders(cafe_id, timestamp DESC, id DESC);
 CREATE INDEX idx_order_items_order_id ON order_items(order_id);
 CREATE INDEX idx_order_items_menu_item_id ON order_items(menu_item_id);
 
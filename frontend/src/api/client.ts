@@ -35,6 +35,9 @@ api.interceptors.response.use(
   }
 );
 
+// Resized copies of an uploaded image, as returned by the upload endpoint
+export type ImageVariants = Record<string, { width: number; height: number; webp: string; avif?: string | null }>;
+
 // Upload API
 export const uploadApi = {
   uploadFile: async (file: File) => {
@@ -47,8 +50,8 @@ export const uploadApi = {
     });
     return response.data;
   },
-  deleteFile: async (filename: string) => {
-    const response = await api.delete('/upload/', { data: { filename } });
+  deleteFile: async (filename: string, variants?: ImageVariants | null) => {
+    const response = await api.delete('/upload/', { data: { filename, variants } });
     return response.data;
   },
 };
@@ -2,7 +2,7 @@ import { useState } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { toast } from 'sonner';
 import { useAuthStore } from '../store/authStore';
-import { menuApi, stockApi, categoriesApi, uploadApi } from '../api/client';
+import { menuApi, stockApi, categoriesApi, uploadApi, ImageVariants } from '../api/client';
 
 interface MenuItem {
   id: string;
@@ -10,6 +10,7 @@ interface MenuItem {
   sale_price: number;
   category_id?: string;
   image_url?: string;
+  image_variants?: ImageVariants | null;
 }
 
 interface MenuCategory {
@@ -57,12 +58,14 @@ export default function MenuPage() {
     sale_price: 0,
     category_id: '',
     image_url: '',
+    image_variants: null as ImageVariants | null,
   });
 
   const [editItem, setEditItem] = useState({
     name: '',
     category_id: '',
     image_url: '',
+    image_variants: null as ImageVariants | null,
   });
 
   const [newCategory, setNewCategory] = useState({
@@ -109,7 +112,7 @@ export default function MenuPage() {
       // If editing and there's an existing image, delete it first
       if (isEdit && editItem.image_url) {
         try {
-          await uploadApi.deleteFile(editItem.image_url);
+          await uploadApi.deleteFile(editItem.image_url, editItem.image_variants);
         } catch (e) {
           console.warn('Failed to delete old image:', e);
         }
@@ -118,9 +121,9 @@ export default function MenuPage() {
       const response = await uploadApi.uploadFile(file);
       
       if (isEdit) {
-        setEditItem(prev => ({ ...prev, image_url: response.url }));
+        setEditItem(prev => ({ ...prev, image_url: response.url, image_variants: response.variants }));
       } else {
-        setNewItem(prev => ({ ...prev, image_url: response.url }));
+        setNewItem(prev => ({ ...prev, image_url: response.url, image_variants: response.variants }));
       }
       
       toast.dismiss(toastId);
@@ -136,7 +139,7 @@ export default function MenuPage() {
     mutationFn: () => menuApi.createMenuItem(selectedCafeId!, newItem),
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['menu', selectedCafeId] });
-      setNewItem({ name: '', sale_price: 0, category_id: '', image_url: '' });
+      setNewItem({ name: '', sale_price: 0, category_id: '', image_url: '', image_variants: null });
       setShowAddModal(false);
       toast.success('✅ تم إضافة الصنف بنجاح!');
     },
@@ -199,7 +202,7 @@ export default function MenuPage() {
       const item = menuItems.find(i => i.id === itemId);
       if (item?.image_url) {
         try {
-          await uploadApi.deleteFile(item.image_url);
+          await uploadApi.deleteFile(item.image_url, item.image_variants);
         } catch (e) {
           console.warn('Failed to delete image:', e);
         }
@@ -549,7 +552,8 @@ export default function MenuPage() {
                               setEditItem({ 
                                 name: item.name, 
                                 category_id: item.category_id || '',
-                                image_url: item.image_url || ''
+                                image_url: item.image_url || '',
+                                image_variants: item.image_variants || null
                               });
                               setShowEditModal(true);
                             }}
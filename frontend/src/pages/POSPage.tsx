@@ -1,7 +1,7 @@
 import { useState } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { useAuthStore } from '../store/authStore';
-import { ordersApi, menuApi, staffApi } from '../api/client';
+import { ordersApi, menuApi, staffApi, ImageVariants } from '../api/client';
 import { toast } from 'react-hot-toast';
 
 interface Order {
@@ -29,8 +29,19 @@ interface MenuItem {
   sale_price: number;
   category: string;
   image_url?: string;
+  image_variants?: ImageVariants | null;
 }
 
+const imageUrl = (url: string) =>
+  url.startsWith('http') ? url : `${import.meta.env.VITE_API_URL || 'http://localhost:8000'}${url}`;
+
+// "url 160w, url 480w, ..." over the stored variants of one format
+const variantSrcSet = (variants: ImageVariants | null | undefined, format: 'avif' | 'webp') =>
+  Object.values(variants || {})
+    .filter(variant => variant[format])
+    .map(variant => `${imageUrl(variant[format]!)} ${variant.width}w`)
+    .join(', ');
+
 interface Staff {
   id: string;
   name: string;
@@ -206,11 +217,26 @@ export default function POSPage() {
               >
                 {item.image_url ? (
                   <div className="h-32 w-full overflow-hidden">
-                    <img 
-                      src={item.image_url.startsWith('http') ? item.image_url : `${import.meta.env.VITE_API_URL || 'http://localhost:8000'}${item.image_url}`} 
-                      alt={item.name}
-                      className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-110"
-                    />
+                    <picture className="block w-full h-full">
+                      {/* Tiles are small: let the browser pick the thumbnail or card variant */}
+                      {(['avif', 'webp'] as const).map(format => {
+                        const srcSet = variantSrcSet(item.image_variants, format);
+                        return srcSet ? (
+                          <source
+                            key={format}
+                            type={`image/${format}`}
+                            sizes="(min-width: 768px) 16rem, 50vw"
+                            srcSet={srcSet}
+                          />
+                        ) : null;
+                      })}
+                      <img 
+                        src={imageUrl(item.image_url)} 
+                        alt={item.name}
+                        loading="lazy"
+                        className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-110"
+                      />
+                    </picture>
                   </div>
                 ) : (
                   <div className="h-32 w-full bg-gray-50 flex items-center justify-center text-4xl">